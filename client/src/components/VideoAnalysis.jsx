@@ -16,7 +16,7 @@ import {
 } from 'lucide-react';
 import ThemeToggle from './ThemeToggle';
 import { useTheme } from '../contexts/ThemeContext';
-import { askQuestion } from '../services/api';
+import { askQuestion, getAnalysis } from '../services/api';
 
 const VideoAnalysis = ({ videoData, onBack }) => {
   if (!videoData?.analysis) {
@@ -51,6 +51,52 @@ const VideoAnalysis = ({ videoData, onBack }) => {
   const [copiedItem, setCopiedItem] = useState(null);
   const chatEndRef = useRef(null);
   const playerRef = useRef(null);
+  const [transcriptPage, setTranscriptPage] = useState({ text: '', nextOffset: null, loaded: false });
+
+  // The analyze response leaves the transcript out; it is paged from the stored
+  // (cacheable) analysis resource instead
+  const fetchTranscriptPage = async (offset, limit = 100) => {
+    const response = await getAnalysis(videoData.video_id, { fields: 'transcript', offset, limit });
+    const page = response?.analysis?.transcript;
+    if (!page) throw new Error('Transcript page unavailable');
+    return page;
+  };
+
+  const loadTranscript = async (offset = 0) => {
+    try {
+      const page = await fetchTranscriptPage(offset);
+      setTranscriptPage(prev => ({
+        text: offset === 0 ? page.text : `${prev.text} ${page.text}`,
+        nextOffset: page.next_offset,
+        loaded: true
+      }));
+    } catch (error) {
+      console.error('Error loading transcript:', error);
+      if (offset === 0) setTranscriptPage({ text: '', nextOffset: null, loaded: false });
+    }
+  };
+
+  useEffect(() => {
+    if (videoData?.video_id) loadTranscript(0);
+  }, [videoData?.video_id]);
+
+  const transcriptText = transcriptPage.text;
+
+  // Copy the whole transcript: fetch only the pages not loaded yet
+  const handleCopyTranscript = async () => {
+    try {
+      let text = transcriptPage.text;
+      let offset = transcriptPage.nextOffset;
+      while (offset !== null && offset !== undefined) {
+        const page = await fetchTranscriptPage(offset, 500);
+        text = `${text} ${page.text}`;
+        offset = page.next_offset;
+      }
+      handleCopy(text, 'transcript');
+    } catch (error) {
+      console.error('Error copying transcript:', error);
+    }
+  };
 
   const modeInfo = {
     default: {
@@ -244,7 +290,7 @@ const VideoAnalysis = ({ videoData, onBack }) => {
               <div className="sticky top-0 bg-white dark:bg-gray-800 border-b border-gray-200 dark:border-gray-700 p-4 flex justify-between items-center">
                 <h3 className="text-lg font-semibold text-gray-900 dark:text-white">Transcript</h3>
                 <button 
-                  onClick={() => handleCopy(videoData.analysis?.transcript || '', 'transcript')}
+                  onClick={handleCopyTranscript}
                   className="flex items-center gap-2 px-3 py-1 text-sm bg-gray-100 dark:bg-gray-700 hover:bg-gray-200 dark:hover:bg-gray-600 rounded-lg transition-colors"
                 >
                   <Copy className="w-4 h-4" />
@@ -253,8 +299,16 @@ const VideoAnalysis = ({ videoData, onBack }) => {
               </div>
               <div className="max-h-96 overflow-y-auto p-4">
                 <pre className="whitespace-pre-wrap text-sm text-gray-700 dark:text-gray-300">
-                  {videoData.analysis?.transcript || "Transcript not available"}
+                  {transcriptText || "Transcript not available"}
                 </pre>
+                {transcriptPage.loaded && transcriptPage.nextOffset !== null && (
+                  <button
+                    onClick={() => loadTranscript(transcriptPage.nextOffset)}
+                    className="mt-3 px-3 py-1 text-sm bg-gray-100 dark:bg-gray-700 hover:bg-gray-200 dark:hover:bg-gray-600 rounded-lg transition-colors"
+                  >
+                    Load more
+                  </button>
+                )}
               </div>
             </div>
           </div>
@@ -2,7 +2,8 @@ export const analyzeVideo = async (url) => {
   const response = await fetch('/api/analyze', {
     method: 'POST',
     headers: {'Content-Type': 'application/json'},
-    body: JSON.stringify({ url })
+    // The transcript is paged from /api/analysis/{video_id} instead
+    body: JSON.stringify({ url, include_transcript: false })
   });
   return await response.json();
 };
@@ -16,6 +17,15 @@ export const askQuestion = async ({video_id, question}) => {
   return await response.json();
 };
 
+export const askQuestions = async ({video_id, questions}) => {
+  const response = await fetch('/api/ask/batch', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({ video_id, questions })
+  });
+  return await response.json();
+};
+
 export const checkHealth = async () => {
   try {
     console.log('Sending health check request');
@@ -28,3 +38,18 @@ export const checkHealth = async () => {
     throw error;
   }
 };
+
+export const getAnalysis = async (videoId, { fields, offset, limit, start, end } = {}) => {
+  const params = new URLSearchParams();
+  if (fields) params.set('fields', Array.isArray(fields) ? fields.join(',') : fields);
+  if (offset !== undefined) params.set('offset', offset);
+  if (limit !== undefined) params.set('limit', limit);
+  if (start !== undefined) params.set('start', start);
+  if (end !== undefined) params.set('end', end);
+  const query = params.toString();
+  // The browser revalidates with If-None-Match and reuses its cached copy on 304
+  const response = await fetch(`/api/analysis/${videoId}${query ? `?${query}` : ''}`, {
+    cache: 'no-cache'
+  });
+  return await response.json();
+};
@@ -0,0 +1,202 @@
+# app/routes/analysis.py
+import re
+import gzip
+import json
+import hashlib
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import Response
+from app.utils.result_store import load_analysis
+from app.utils.checkpoint import get_partial_transcript
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+ALLOWED_FIELDS = {"summary", "key_points", "language", "model", "timestamp", "transcript", "preprocessing"}
+DEFAULT_FIELDS = ["summary", "key_points", "language", "timestamp"]
+MAX_SEGMENT_PAGE = 500
+# Selections made only of these always fit in a few hundred bytes; not worth compressing
+UNCOMPRESSED_FIELDS = {"language", "model", "timestamp"}
+
+
+def _validate_video_id(video_id: str):
+    if len(video_id) > 100 or not re.match(r'^[a-zA-Z0-9_-]{11}$', video_id):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid video ID format. Must be exactly 11 alphanumeric characters"
+        )
+
+
+def _parse_fields(fields: Optional[str]) -> list:
+    if not fields:
+        return DEFAULT_FIELDS
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in ALLOWED_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(sorted(ALLOWED_FIELDS))}"
+        )
+    return selected
+
+
+def _transcript_page(record: dict, offset: int, limit: int,
+                     start: Optional[float], end: Optional[float]) -> dict:
+    """Slice the stored transcript segments by time range and page."""
+    segments = record.get("segments") or []
+    if not segments and record.get("transcript"):
+        # Records without timing info are served as a single segment
+        segments = [{"start": 0.0, "end": 0.0, "text": record["transcript"].strip()}]
+
+    if start is not None:
+        segments = [s for s in segments if s["end"] >= start]
+    if end is not None:
+        segments = [s for s in segments if s["start"] <= end]
+
+    total = len(segments)
+    page = segments[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < total else None
+    return {
+        "segments": page,
+        "text": " ".join(s["text"] for s in page),
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "next_offset": next_offset
+    }
+
+
+def _representation_etag(record_etag: str, fields: list, params: dict) -> str:
+    """ETag for one selection of a stored record; computed before the body is built."""
+    key = json.dumps({"record": record_etag, "fields": fields, "params": params}, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        # Encoded variants carry a suffix, but describe the same content
+        if tag.split("-")[0] == etag:
+            return True
+    return False
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+@router.get("/analysis/{video_id}")
+async def get_analysis(
+    request: Request,
+    video_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. summary,key_points"),
+    offset: int = Query(0, ge=0, description="First transcript segment to return"),
+    limit: int = Query(100, ge=1, le=MAX_SEGMENT_PAGE, description="Transcript segments per page"),
+    start: Optional[float] = Query(None, ge=0, description="Only segments ending after this second"),
+    end: Optional[float] = Query(None, ge=0, description="Only segments starting before this second")
+):
+    """Stored analysis resource with field selection, transcript paging, ETags and compression"""
+    _validate_video_id(video_id)
+    selected = _parse_fields(fields)
+
+    stored = load_analysis(video_id)
+    if stored is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No analysis stored for this video. Run /api/analyze first."
+        )
+    record, record_etag = stored
+
+    # The variant (and so its ETag) depends only on the request, so revalidation
+    # is answered before the transcript is sliced or anything is serialized,
+    # and a 304 carries exactly the tag the 200 for the same request would have
+    params = {"offset": offset, "limit": limit, "start": start, "end": end} if "transcript" in selected else {}
+    etag = _representation_etag(record_etag, selected, params)
+    encoding = None
+    if not set(selected) <= UNCOMPRESSED_FIELDS:
+        encoding = _choose_encoding(request.headers.get("accept-encoding", ""))
+    suffix = {"br": "-br", "gzip": "-gzip"}.get(encoding, "")
+    headers = {
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+        "ETag": f'"{etag}{suffix}"'
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    analysis = {}
+    for field in selected:
+        if field == "transcript":
+            analysis["transcript"] = _transcript_page(record, offset, limit, start, end)
+        else:
+            analysis[field] = record.get(field)
+
+    body = json.dumps({
+        "status": "success",
+        "analysis": analysis,
+        "video_id": video_id
+    }, ensure_ascii=False).encode("utf-8")
+
+    if encoding == "br":
+        body = brotli.compress(body)
+        headers["Content-Encoding"] = "br"
+    elif encoding == "gzip":
+        body = gzip.compress(body, mtime=0)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/analysis/{video_id}/partial")
+async def get_partial_analysis(
+    video_id: str,
+    offset: int = Query(0, ge=0, description="First transcript segment to return"),
+    limit: int = Query(100, ge=1, le=MAX_SEGMENT_PAGE, description="Transcript segments per page")
+):
+    """Transcript checkpointed so far for a video whose transcription may still be running"""
+    _validate_video_id(video_id)
+    partial = get_partial_transcript(video_id)
+    if partial is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No transcription in progress for this video"
+        )
+
+    page = _transcript_page({"segments": partial["segments"]}, offset, limit, None, None)
+    return {
+        "status": "completed" if partial["completed"] else "processing",
+        "video_id": video_id,
+        "model": partial["model"],
+        "language": partial["language"],
+        "transcribed_seconds": partial["transcribed_seconds"],
+        "duration": partial["duration"],
+        "transcript": page
+    }
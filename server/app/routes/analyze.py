@@ -9,15 +9,18 @@ from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from typing import Optional
 from fastapi.websockets import WebSocketDisconnect
-from app.utils.transcript import get_transcript # Only keep get_transcript
-from app.utils.summarizer import generate_summary, generate_key_points, get_usage_metrics
-from app.utils.embed_store import store_embeddings
+from app.utils.transcript import transcribe_video
+from app.utils.summarizer import get_usage_metrics
+from app.utils.ingest import StreamingIngest
+from app.utils.result_store import save_analysis
+from app.utils.scheduler import LaneOverloaded, run_in_lane, get_client_id, get_scheduler_metrics
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 class AnalyzeRequest(BaseModel):
     url: str
+    include_transcript: bool = True  # clients paging GET /api/analysis/{video_id} can skip it
 
 def validate_youtube_url(url: str) -> bool:
     """Validate all common YouTube URL formats"""
@@ -46,36 +49,84 @@ def get_video_id(url: str) -> str:
     
     raise HTTPException(status_code=400, detail="Invalid YouTube URL format")
 
-async def process_video(video_id: str) -> dict:
+async def process_video(video_id: str, client_id: str = "internal", include_transcript: bool = True) -> dict:
     """Core video processing pipeline with enhanced error handling"""
     try:
-        # Get transcript (now always using local Whisper via pytube)
-        # get_transcript now returns (transcript_text, language)
-        transcript, language = get_transcript(video_id) 
-        
-        # Generate analysis components
-        summary = generate_summary(transcript)
-        key_points = generate_key_points(transcript) or ["Key points not available"]
-        
-        # Safe embedding storage
+        # Get transcript (now always using local Whisper via yt-dlp)
+        # transcribe_video also keeps the timed segments for the analysis resource.
+        # Admission happens here: an overloaded transcription lane rejects with 429.
+        # Segments stream through a queue while Whisper runs, so embedding and
+        # section summaries overlap with transcription instead of waiting for it.
+        loop = asyncio.get_running_loop()
+        segment_queue: asyncio.Queue = asyncio.Queue()
+
+        def on_segments(segments, language):
+            loop.call_soon_threadsafe(segment_queue.put_nowait, (segments, language))
+
+        transcription_task = asyncio.create_task(run_in_lane(
+            "transcription", client_id, transcribe_video, video_id, on_segments=on_segments
+        ))
+        # Runs on the loop after every on_segments callback, so it always arrives last
+        transcription_task.add_done_callback(lambda _: segment_queue.put_nowait(None))
+
+        ingest = StreamingIngest(video_id, client_id)
         try:
-            if store_embeddings and callable(store_embeddings):
-                # Use asyncio.to_thread for blocking (synchronous) calls like store_embeddings
-                await asyncio.to_thread(store_embeddings, video_id, transcript) 
-        except Exception as e:
-            logger.error(f"Embedding storage failed (non-critical): {str(e)}")
+            while (item := await segment_queue.get()) is not None:
+                segments, segment_language = item
+                await ingest.feed(segments, segment_language)
 
-        return {
-            "status": "success",
-            "analysis": {
+            transcription = await transcription_task
+            transcript = transcription["text"]
+            language = transcription["language"]
+
+            # Only the reduce step is left: summary and key points from the section
+            # summaries (or the compressed transcript for short videos)
+            summary, key_points, preprocessing = await ingest.finish(transcript, language)
+        finally:
+            # On failure stop waiting for Whisper: its thread still finishes and
+            # checkpoints (holding the lane slot), so a retry resumes from there
+            transcription_task.cancel()
+            ingest.close()
+
+        timestamp = datetime.now().isoformat()
+
+        # Persist results so GET /api/analysis/{video_id} can serve them cheaply
+        try:
+            save_analysis(video_id, {
+                "video_id": video_id,
                 "summary": summary,
                 "key_points": key_points,
                 "language": language,
-                "transcript": transcript  # Ensure transcript is included
-            },
+                "model": transcription["model"],
+                "transcript": transcript,
+                "segments": transcription["segments"],
+                "preprocessing": preprocessing,
+                "timestamp": timestamp
+            })
+        except Exception as e:
+            logger.error(f"Result storage failed (non-critical): {str(e)}")
+
+        analysis = {
+            "summary": summary,
+            "key_points": key_points,
+            "language": language,
+            "model": transcription["model"],
+            "preprocessing": preprocessing
+        }
+        if include_transcript:
+            analysis["transcript"] = transcript
+        return {
+            "status": "success",
+            "analysis": analysis,
             "video_id": video_id,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
+    except LaneOverloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Server busy ({e.lane}), please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Video processing failed: {str(e)}", exc_info=True)
         # Re-raise HTTPException to be caught by the outer analyze_video endpoint
@@ -102,7 +153,7 @@ async def analyze_video(request: Request, data: AnalyzeRequest):
             )
             
         video_id = get_video_id(data.url)
-        response = await process_video(video_id)
+        response = await process_video(video_id, get_client_id(request), data.include_transcript)
         
         logger.info(f"Successfully processed video: {video_id}")
         return response
@@ -122,6 +173,7 @@ async def get_usage_stats():
     return {
         "status": "success",
         "metrics": get_usage_metrics(),
+        "lanes": get_scheduler_metrics(),
         "server_time": datetime.now().isoformat()
     }
 
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Request, HTTPException
-from app.utils.qa import get_answer
+from app.utils.qa import get_answer, get_answers_batch, MAX_BATCH_QUESTIONS
+from app.utils.scheduler import LaneOverloaded, run_in_lane, get_client_id
 import logging
 import traceback
 import re
@@ -9,6 +10,30 @@ from datetime import datetime
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def format_answer(answer: str) -> dict:
+    """Shape a QA answer string into the beyond/default/buddy response types"""
+    if "Based on the video:" in answer and "Beyond the video:" in answer:
+        return {
+            "type": "beyond",
+            "transcript_answer": answer.split("Based on the video:")[1].split("Beyond the video:")[0].strip(),
+            "general_answer": answer.split("Beyond the video:")[1].strip()
+        }
+    elif "Based on the video:" in answer:
+        return {
+            "type": "default",
+            "answer": answer.replace("Based on the video:", "").strip()
+        }
+    elif "Answer:" in answer:
+        return {
+            "type": "buddy",
+            "answer": answer.replace("Answer:", "").strip()
+        }
+    else:
+        return {
+            "type": "default",
+            "answer": answer
+        }
+
 @router.post("/ask")
 async def ask_question(request: Request):
     try:
@@ -56,31 +81,11 @@ async def ask_question(request: Request):
             
         logger.debug(f"Processing question for video {video_id}: {question[:50]}...")
         
-        # Get answer from QA system
-        answer = get_answer(video_id, question)
+        # Get answer from QA system in the dedicated qa lane, so heavy analyses
+        # running on the other lanes do not delay interactive questions
+        answer = await run_in_lane("qa", get_client_id(request), get_answer, video_id, question)
         
-        # Format response based on answer type
-        if "Based on the video:" in answer and "Beyond the video:" in answer:
-            response_data = {
-                "type": "beyond",
-                "transcript_answer": answer.split("Based on the video:")[1].split("Beyond the video:")[0].strip(),
-                "general_answer": answer.split("Beyond the video:")[1].strip()
-            }
-        elif "Based on the video:" in answer:
-            response_data = {
-                "type": "default",
-                "answer": answer.replace("Based on the video:", "").strip()
-            }
-        elif "Answer:" in answer:
-            response_data = {
-                "type": "buddy",
-                "answer": answer.replace("Answer:", "").strip()
-            }
-        else:
-            response_data = {
-                "type": "default",
-                "answer": answer
-            }
+        response_data = format_answer(answer)
         
         return {
             "status": "success",
@@ -91,9 +96,98 @@ async def ask_question(request: Request):
         
     except HTTPException:
         raise
+    except LaneOverloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many questions in flight, please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Ask endpoint error: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while processing your question"
         )
+
+@router.post("/ask/batch")
+async def ask_questions_batch(request: Request):
+    """Answer several questions about one video with shared retrieval and one LLM call"""
+    try:
+        logger.info("=== NEW BATCH ASK REQUEST ===")
+
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid JSON format in request body"
+            )
+
+        if not isinstance(data, dict):
+            raise HTTPException(
+                status_code=400,
+                detail="Request body must be a JSON object"
+            )
+
+        video_id = data.get("video_id")
+        questions = data.get("questions")
+
+        if not video_id or not questions:
+            raise HTTPException(
+                status_code=400,
+                detail="Both 'video_id' and 'questions' fields are required"
+            )
+
+        if len(video_id) > 100 or not re.match(r'^[a-zA-Z0-9_-]{11}$', video_id):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid video ID format. Must be exactly 11 alphanumeric characters"
+            )
+
+        if not isinstance(questions, list) or not all(isinstance(q, str) and q.strip() for q in questions):
+            raise HTTPException(
+                status_code=400,
+                detail="'questions' must be a list of non-empty strings"
+            )
+
+        if len(questions) > MAX_BATCH_QUESTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many questions. Maximum {MAX_BATCH_QUESTIONS} per batch"
+            )
+
+        if any(len(q) > 500 for q in questions):
+            raise HTTPException(
+                status_code=400,
+                detail="Question too long. Maximum 500 characters allowed"
+            )
+
+        logger.debug(f"Processing {len(questions)} questions for video {video_id}")
+
+        # One qa lane slot for the whole batch
+        answers = await run_in_lane("qa", get_client_id(request), get_answers_batch, video_id, questions)
+
+        return {
+            "status": "success",
+            "data": [
+                {"question": question, **format_answer(answer)}
+                for question, answer in zip(questions, answers)
+            ],
+            "video_id": video_id,
+            "generated_at": datetime.now().isoformat()
+        }
+
+    except HTTPException:
+        raise
+    except LaneOverloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many questions in flight, please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        logger.error(f"Batch ask endpoint error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="An error occurred while processing your questions"
+        )
@@ -0,0 +1,162 @@
+#checkpoint.py
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+from typing import Dict, List, Optional
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "checkpoints")
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", str(24 * 3600)))  # seconds since last progress
+
+logger = logging.getLogger(__name__)
+
+_job_locks: Dict[str, threading.Lock] = {}
+_job_locks_guard = threading.Lock()
+
+
+def _job_key(video_id: str, model_name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_.-]", "_", f"{video_id}__{model_name}")
+
+
+def job_dir(video_id: str, model_name: str) -> str:
+    """Directory holding the checkpoint for one (video, model) transcription job."""
+    return os.path.join(CHECKPOINT_DIR, _job_key(video_id, model_name))
+
+
+def source_dir(video_id: str) -> str:
+    """Directory holding the downloaded audio and language probe for a video."""
+    return job_dir(video_id, "source")
+
+
+def job_lock(video_id: str) -> threading.Lock:
+    """Per-video lock so two requests never download or transcribe the same video at once."""
+    key = _job_key(video_id, "")
+    with _job_locks_guard:
+        return _job_locks.setdefault(key, threading.Lock())
+
+
+def load_probe(video_id: str) -> Optional[Dict]:
+    """Language probe result (language, model) recorded for a video, if any."""
+    try:
+        with open(os.path.join(source_dir(video_id), "probe.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_probe(video_id: str, probe: Dict):
+    directory = source_dir(video_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "probe.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(probe, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_checkpoint(video_id: str, model_name: str) -> Optional[Dict]:
+    path = os.path.join(job_dir(video_id, model_name), "checkpoint.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+
+def save_checkpoint(video_id: str, model_name: str, checkpoint: Dict):
+    """Atomically write the checkpoint so a crash never leaves a torn file."""
+    directory = job_dir(video_id, model_name)
+    os.makedirs(directory, exist_ok=True)
+    checkpoint["updated_at"] = time.time()
+    path = os.path.join(directory, "checkpoint.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def new_checkpoint(video_id: str, model_name: str, window_seconds: int) -> Dict:
+    return {
+        "video_id": video_id,
+        "model": model_name,
+        "window_seconds": window_seconds,
+        "next_offset": 0.0,
+        "duration": None,
+        "language": None,
+        "segments": [],
+        "completed": False,
+        "updated_at": time.time()
+    }
+
+
+def remove_audio(video_id: str):
+    """Drop the downloaded audio once a job has finished; checkpoint and probe are kept."""
+    directory = source_dir(video_id)
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith("audio"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError as e:
+                logger.warning(f"Could not remove audio {name} for {video_id}: {e}")
+
+
+def get_partial_transcript(video_id: str) -> Optional[Dict]:
+    """Most recently updated checkpoint for a video, readable while the job runs."""
+    if not os.path.isdir(CHECKPOINT_DIR):
+        return None
+    prefix = _job_key(video_id, "")
+    latest = None
+    for name in os.listdir(CHECKPOINT_DIR):
+        if not name.startswith(prefix) or name == _job_key(video_id, "source"):
+            continue
+        checkpoint = load_checkpoint(video_id, name[len(prefix):])
+        if checkpoint and (latest is None or checkpoint["updated_at"] > latest["updated_at"]):
+            latest = checkpoint
+    if latest is None:
+        return None
+
+    segments: List[Dict] = latest["segments"]
+    return {
+        "video_id": video_id,
+        "model": latest["model"],
+        "language": latest["language"],
+        "completed": latest["completed"],
+        "transcribed_seconds": latest["next_offset"],
+        "duration": latest["duration"],
+        "segments": segments,
+        "text": " ".join(s["text"] for s in segments)
+    }
+
+
+def cleanup_checkpoints(max_age: int = CHECKPOINT_TTL) -> int:
+    """Delete jobs with no progress for max_age seconds. Returns the number removed."""
+    if not os.path.isdir(CHECKPOINT_DIR):
+        return 0
+    removed = 0
+    now = time.time()
+    for name in os.listdir(CHECKPOINT_DIR):
+        directory = os.path.join(CHECKPOINT_DIR, name)
+        if not os.path.isdir(directory):
+            continue
+        # Last progress is the newest file: checkpoint.json, probe.json or the audio
+        files = [os.path.join(directory, f) for f in os.listdir(directory)]
+        updated_at = max((os.path.getmtime(f) for f in files), default=os.path.getmtime(directory))
+        if now - updated_at < max_age:
+            continue
+        # Model names never contain "__", video IDs may
+        with _job_locks_guard:
+            lock = _job_locks.get(name.rsplit("__", 1)[0] + "__")
+        if lock is not None and lock.locked():
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        removed += 1
+    if removed:
+        logger.info(f"Removed {removed} abandoned transcription checkpoint(s)")
+    return removed
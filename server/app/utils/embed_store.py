@@ -3,29 +3,53 @@ import os
 from langchain_community.vectorstores import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
 import logging
 
 MAX_TRANSCRIPT_LENGTH = 100000  # ~100k characters
 
-def store_embeddings(video_id: str, transcript: str):
+def _embedding_function():
+    return GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=os.getenv("GEMINI_API_KEY")
+    )
+
+def _split(text: str, offset: int = 0):
+    # start_index lets retrieval merge overlapping/adjacent chunks back together
+    documents = RecursiveCharacterTextSplitter(
+        chunk_size=500, chunk_overlap=100, add_start_index=True).create_documents([text])
+    for doc in documents:
+        doc.metadata["start_index"] += offset
+    return documents
+
+def append_embeddings(video_id: str, text: str, offset: int = 0, replace: bool = False) -> int:
+    """
+    Index one more piece of a transcript while it is still being produced.
+    offset is the piece's position in the full text; chunk IDs derive from it,
+    so re-indexing the same piece (e.g. after a resumed job) overwrites instead of duplicating.
+    replace=True first drops the video's existing collection, so chunks of an
+    earlier, different transcript cannot outlive a re-analysis.
+    Returns the number of chunks added.
+    """
     try:
         if not video_id or len(video_id) > 100:
             raise ValueError("Invalid video ID")
-        if not transcript or len(transcript) > MAX_TRANSCRIPT_LENGTH:
-            raise ValueError("Transcript too long or empty")
-            
-        documents = [Document(page_content=chunk) for chunk in RecursiveCharacterTextSplitter(
-            chunk_size=500, chunk_overlap=100).split_text(transcript)]
+        if not text or not text.strip():
+            return 0
 
-        Chroma.from_documents(
-            documents=documents,
-            embedding=GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=os.getenv("GEMINI_API_KEY")
-            ),
-            persist_directory=f"chroma_db/{video_id}"
+        documents = _split(text, offset)
+        ids = [f"{video_id}-{doc.metadata['start_index']}" for doc in documents]
+        vectorstore = Chroma(
+            persist_directory=f"chroma_db/{video_id}",
+            embedding_function=_embedding_function()
         )
+        if replace:
+            vectorstore.delete_collection()
+            vectorstore = Chroma(
+                persist_directory=f"chroma_db/{video_id}",
+                embedding_function=_embedding_function()
+            )
+        vectorstore.add_documents(documents, ids=ids)
+        return len(documents)
     except Exception as e:
-        logging.error(f"Failed to store embeddings: {str(e)}")
+        logging.error(f"Failed to append embeddings: {str(e)}")
         raise
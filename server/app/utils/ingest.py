@@ -0,0 +1,136 @@
+#ingest.py
+import os
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from app.utils.preprocess import preprocess_transcript, CHARS_PER_TOKEN
+from app.utils.summarizer import (
+    generate_summary, generate_key_points, generate_chunk_summary, MAX_TRANSCRIPT_LENGTH
+)
+from app.utils.embed_store import append_embeddings
+from app.utils.scheduler import run_in_lane
+
+# Token budget for the text sent to the summary/key-point prompts (fits the summarizer window)
+LLM_TOKEN_BUDGET = int(os.getenv("LLM_TOKEN_BUDGET", str(MAX_TRANSCRIPT_LENGTH // CHARS_PER_TOKEN)))
+STREAM_CHUNK_CHARS = int(os.getenv("STREAM_CHUNK_CHARS", "6000"))  # text per embed/map step
+
+logger = logging.getLogger(__name__)
+
+# Videos with an analysis running in this process (video_id -> number of jobs)
+_active_videos: Counter = Counter()
+
+
+def ingest_in_progress(video_id: str) -> bool:
+    """Whether an analysis of this video is still transcribing or ingesting."""
+    return _active_videos[video_id] > 0
+
+
+class StreamingIngest:
+    """
+    Consumes transcript segments while Whisper is still running:
+    every STREAM_CHUNK_CHARS of text is cleaned, embedded into the video's
+    index (so /api/ask can use it right away) and summarized on its own.
+    finish() then only has to reduce the section summaries.
+
+    Sections are cut at segment boundaries regardless of how the segments were
+    batched, so a resumed job replaying its checkpoint produces the same
+    sections, offsets and chunk IDs as the original run.
+
+    The map step lags one section behind, so a video that fits in a single
+    section goes straight to the usual one-pass summary without an extra call.
+    """
+
+    def __init__(self, video_id: str, client_id: str):
+        self.video_id = video_id
+        self.client_id = client_id
+        self._buffer: List[str] = []
+        self._buffer_chars = 0
+        self._offset = 0
+        self._pending_section = None
+        self.section_summaries: List[str] = []
+        self.indexed_chunks = 0
+        self._closed = False
+        self.language: Optional[str] = None
+        _active_videos[video_id] += 1
+
+    def close(self):
+        """Drop the in-progress mark; safe to call more than once."""
+        if not self._closed:
+            self._closed = True
+            _active_videos[self.video_id] -= 1
+            if _active_videos[self.video_id] <= 0:
+                del _active_videos[self.video_id]
+
+    async def feed(self, segments: List[Dict], language: Optional[str] = None):
+        if language:
+            self.language = language  # selects the filler list used by preprocessing
+        for seg in segments:
+            if not seg.get("text"):
+                continue
+            self._buffer.append(seg["text"])
+            self._buffer_chars += len(seg["text"]) + 1
+            if self._buffer_chars >= STREAM_CHUNK_CHARS:
+                await self._process_buffer()
+
+    async def _process_buffer(self):
+        raw = " ".join(self._buffer)
+        self._buffer, self._buffer_chars = [], 0
+        section, _ = await asyncio.to_thread(preprocess_transcript, raw, language=self.language)
+        if not section:
+            return
+
+        try:
+            # The first section replaces the video's index: the whole transcript is
+            # streamed again (a resumed job replays its checkpoint), so nothing of an
+            # earlier, possibly different, transcript has to survive
+            self.indexed_chunks += await run_in_lane(
+                "llm", self.client_id, append_embeddings, self.video_id, section, self._offset,
+                replace=self._offset == 0, admit=False
+            )
+        except Exception as e:
+            logger.error(f"Incremental embedding failed (non-critical): {str(e)}")
+        self._offset += len(section) + 1
+
+        if self._pending_section is not None:
+            await self._summarize_section(self._pending_section)
+        self._pending_section = section
+        logger.debug(
+            f"Ingested section for {self.video_id}: {self.indexed_chunks} chunks indexed, "
+            f"{len(self.section_summaries)} sections summarized"
+        )
+
+    async def _summarize_section(self, section: str):
+        summary = await run_in_lane("llm", self.client_id, generate_chunk_summary, section, admit=False)
+        if not summary:
+            # Keep the section represented in the reduce step even if the map call failed
+            summary, _ = await asyncio.to_thread(preprocess_transcript, section, LLM_TOKEN_BUDGET // 8)
+        self.section_summaries.append(summary)
+
+    async def finish(self, transcript: str, language: Optional[str] = None) -> Tuple[str, List[str], Dict]:
+        """Flush the tail and produce (summary, key_points, preprocessing stats)."""
+        if language:
+            self.language = language
+        if self._buffer:
+            await self._process_buffer()
+
+        condensed, preprocessing = await asyncio.to_thread(
+            preprocess_transcript, transcript, LLM_TOKEN_BUDGET, self.language
+        )
+
+        if self.section_summaries:
+            await self._summarize_section(self._pending_section)
+            reduce_input, _ = await asyncio.to_thread(
+                preprocess_transcript, "\n\n".join(self.section_summaries), LLM_TOKEN_BUDGET
+            )
+            preprocessing["sections"] = len(self.section_summaries)
+        else:
+            reduce_input = condensed
+            preprocessing["sections"] = 1 if self._pending_section else 0
+        preprocessing["indexed_chunks"] = self.indexed_chunks
+
+        summary = await run_in_lane("llm", self.client_id, generate_summary, reduce_input, admit=False)
+        key_points = await run_in_lane(
+            "llm", self.client_id, generate_key_points, reduce_input, admit=False
+        ) or ["Key points not available"]
+        return summary, key_points, preprocessing
@@ -0,0 +1,205 @@
+#preprocess.py
+import re
+import logging
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4  # rough estimate for ASCII (mostly English) text
+NON_ASCII_CHARS_PER_TOKEN = 2  # Cyrillic, Devanagari, Arabic... split into more tokens
+MAX_REPEAT_NGRAM = 8  # longest phrase checked for back-to-back repetition
+
+logger = logging.getLogger(__name__)
+
+# Fillers that carry no content, per Whisper language code. Phrases like "you know"
+# only count when set off by commas. Languages without a list are left untouched:
+# "er" and "um" are real words in German, Dutch and Portuguese.
+_FILLER_PATTERNS = {
+    "en": [
+        re.compile(r"\b(?:um+|uh+|uhm+|erm+|er|ah+|hmm+|mm+)\b[,.]?\s*", re.IGNORECASE),
+        re.compile(r",\s*(?:you know|i mean|like|sort of|kind of|basically|actually)\s*,", re.IGNORECASE),
+        re.compile(r"^(?:so|well|okay|ok|right),\s+", re.IGNORECASE | re.MULTILINE),
+    ],
+}
+# Latin, Devanagari (danda) and Arabic terminators are followed by a space; CJK ones often are not
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?\u0964\u061f])\s+|(?<=[\u3002\uff01\uff1f])\s*")
+# CJK punctuation, ideographs, kana, Hangul and full-width forms: roughly one token per character
+_DENSE_CHAR = re.compile(
+    r"[\u1100-\u11ff\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "but", "of", "to", "in", "on", "at", "for", "with", "is",
+    "are", "was", "were", "be", "been", "it", "this", "that", "these", "those", "i", "you",
+    "we", "they", "he", "she", "so", "just", "do", "did", "have", "has", "had", "not", "what",
+    "there", "here", "my", "your", "our", "as", "if", "can", "will", "going", "get", "got",
+}
+
+
+def _char_tokens(char: str) -> float:
+    if char < "\x80":
+        return 1 / CHARS_PER_TOKEN
+    if _DENSE_CHAR.match(char):
+        return 1.0
+    return 1 / NON_ASCII_CHARS_PER_TOKEN
+
+
+def estimate_tokens(text: str) -> int:
+    """Script-aware token estimate; CJK text costs about a token per character."""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    dense_chars = len(_DENSE_CHAR.findall(text))
+    other_chars = len(text) - ascii_chars - dense_chars
+    return int(dense_chars + other_chars / NON_ASCII_CHARS_PER_TOKEN + ascii_chars / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, token_budget: int) -> str:
+    """Longest prefix of text whose estimate fits in token_budget."""
+    if estimate_tokens(text) <= token_budget:
+        return text
+    used = 0.0
+    for index, char in enumerate(text):
+        used += _char_tokens(char)
+        if used > token_budget + 1e-9:
+            return text[:index]
+    return text
+
+
+def remove_fillers(text: str, language: Optional[str] = "en") -> str:
+    """Drop filler words and comma-delimited filler phrases of the given language."""
+    patterns = _FILLER_PATTERNS.get(language)
+    if not patterns:
+        return text
+    for pattern in patterns:
+        text = pattern.sub(lambda m: "," if m.group(0).startswith(",") else "", text)
+    text = re.sub(r"\s+,", ",", text)
+    text = re.sub(r",{2,}", ",", text)
+    return re.sub(r"[ \t]{2,}", " ", text).strip()
+
+
+def _norm(token: str) -> str:
+    """Lower-case a token and drop punctuation/symbols; combining marks (e.g. Devanagari vowel signs) stay."""
+    return "".join(
+        c for c in token.lower()
+        if c == "'" or not unicodedata.category(c).startswith(("P", "S"))
+    )
+
+
+def _words(text: str) -> List[str]:
+    """Normalized words of any script (whitespace-delimited, so CJK text yields whole phrases)."""
+    return [w for w in (_norm(t) for t in text.split()) if w]
+
+
+def collapse_repeats(text: str, max_n: int = MAX_REPEAT_NGRAM) -> str:
+    """
+    Collapse phrases repeated back to back ("thank you thank you thank you"),
+    the typical shape of a Whisper hallucination loop. Keeps the first copy.
+    """
+    tokens = text.split()
+    norms = [_norm(t) for t in tokens]
+    for n in range(max_n, 0, -1):
+        if len(tokens) < 2 * n:
+            continue
+        kept_tokens, kept_norms = [], []
+        i = 0
+        while i < len(tokens):
+            phrase = norms[i:i + n]
+            j = i + n
+            # Skip every immediate repetition of this phrase
+            while any(phrase) and len(phrase) == n and norms[j:j + n] == phrase:
+                j += n
+            if j > i + n:
+                # Keep the last copy's final token so trailing punctuation survives
+                kept_tokens.extend(tokens[i:i + n - 1] + [tokens[j - 1]])
+                kept_norms.extend(phrase)
+                i = j
+            else:
+                kept_tokens.append(tokens[i])
+                kept_norms.append(norms[i])
+                i += 1
+        tokens, norms = kept_tokens, kept_norms
+    return " ".join(tokens)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+def dedupe_sentences(sentences: List[str]) -> List[str]:
+    """
+    Drop sentences that already appeared (case and punctuation insensitive).
+    Sentences without any words (e.g. only emoji or "...") are kept as they are.
+    """
+    seen = set()
+    unique = []
+    for sentence in sentences:
+        key = " ".join(_words(sentence))
+        if key in seen:
+            continue
+        if key:
+            seen.add(key)
+        unique.append(sentence)
+    return unique
+
+
+def select_sentences(sentences: List[str], token_budget: int) -> List[str]:
+    """
+    Extractive pre-selection: score sentences by the document frequency of their
+    content words and keep the best ones that fit the budget, in original order.
+    """
+    if estimate_tokens(" ".join(sentences)) <= token_budget:
+        return sentences
+
+    words_per_sentence = [
+        [w for w in _words(s) if w not in _STOPWORDS and len(w) > 2]
+        for s in sentences
+    ]
+    frequencies = Counter(w for words in words_per_sentence for w in set(words))
+
+    scored = []
+    for index, (sentence, words) in enumerate(zip(sentences, words_per_sentence)):
+        score = sum(frequencies[w] for w in set(words)) / (len(words) + 1) if words else 0.0
+        scored.append((score, index))
+    # Highest score first; ties go to the earlier sentence
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    chosen, used = [], 0
+    for score, index in scored:
+        cost = estimate_tokens(sentences[index]) + 1
+        if used + cost > token_budget:
+            continue
+        chosen.append(index)
+        used += cost
+    return [sentences[i] for i in sorted(chosen)]
+
+
+def preprocess_transcript(text: str, token_budget: Optional[int] = None,
+                          language: Optional[str] = None) -> Tuple[str, Dict]:
+    """
+    Deterministic clean-up run between transcription and the LLM consumers:
+    filler removal (only for a known language with a filler list), repeated-phrase
+    collapse, sentence de-duplication and, when a token budget is given,
+    extractive pre-selection. Returns (text, stats).
+    """
+    original_chars = len(text or "")
+    if not text or not text.strip():
+        return text, {"original_chars": original_chars, "compressed_chars": original_chars, "ratio": 1.0}
+
+    cleaned = remove_fillers(text, language)
+    cleaned = collapse_repeats(cleaned)
+    sentences = dedupe_sentences(split_sentences(cleaned))
+    deduped_chars = len(" ".join(sentences))
+    if token_budget:
+        sentences = select_sentences(sentences, token_budget)
+    result = " ".join(sentences)
+
+    stats = {
+        "original_chars": original_chars,
+        "cleaned_chars": deduped_chars,
+        "compressed_chars": len(result),
+        "ratio": round(len(result) / original_chars, 3) if original_chars else 1.0,
+        "token_budget": token_budget,
+    }
+    logger.info(
+        f"Preprocessed transcript {original_chars} -> {len(result)} chars "
+        f"(ratio {stats['ratio']}, budget {token_budget})"
+    )
+    return result, stats
@@ -1,16 +1,90 @@
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
+import re
+import json
 import os
 import logging
-from langchain.chains import RetrievalQA
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.vectorstores import Chroma
-from app.utils.transcript import get_transcript # Ensure this is imported
+from app.utils.preprocess import preprocess_transcript, estimate_tokens
+from app.utils.embed_store import append_embeddings, MAX_TRANSCRIPT_LENGTH as MAX_EMBED_LENGTH
+from app.utils.result_store import load_analysis
+from app.utils.retrieval import (
+    search_chunks, search_chunks_by_vector, interleave_results, pack_context
+)
+from app.utils.ingest import ingest_in_progress
 
 MAX_QUESTION_LENGTH = 500
+MAX_BATCH_QUESTIONS = 10
+QA_BATCH_CONTEXT_TOKEN_BUDGET = int(os.getenv("QA_BATCH_CONTEXT_TOKEN_BUDGET", "3000"))
 
 logger = logging.getLogger(__name__)
 
+def _open_vectorstore(video_id: str) -> Tuple[Optional[Chroma], Optional[str]]:
+    """
+    Chroma index for a video, rebuilding it from the stored analysis if it is missing.
+    Returns (vectorstore, None), or (None, message) when the video has not been analyzed.
+    Whisper never runs here: transcription belongs to the transcription lane of /api/analyze.
+    """
+    # Setup embeddings and Chroma for transcript-based retrieval
+    embedding_function = GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=os.getenv("GEMINI_API_KEY")
+    )
+    chroma_path = f"chroma_db/{video_id}"
+
+    if not os.path.exists(chroma_path):
+        if ingest_in_progress(video_id):
+            # Streaming ingest indexes the first section shortly; don't build a second index
+            return None, "This video is still being transcribed. Please ask again in a moment."
+
+        stored = load_analysis(video_id)
+        transcript_text = stored[0].get("transcript") if stored else None
+        if not transcript_text:
+            return None, "This video has not been analyzed yet. Please run /api/analyze first."
+        transcript_text, _ = preprocess_transcript(transcript_text, language=stored[0].get("language"))
+        # Chunk IDs are deterministic, so a concurrent rebuild overwrites instead of duplicating
+        append_embeddings(video_id, transcript_text[:MAX_EMBED_LENGTH])
+
+    vectorstore = Chroma(
+        persist_directory=chroma_path,
+        embedding_function=embedding_function
+    )
+    return vectorstore, None
+
+def _finalize_answer(question: str, transcript_answer: str, ask_general: Callable[[], str]) -> str:
+    """Apply the Default/Beyond mode rules to a transcript-based answer."""
+    if not transcript_answer:
+        transcript_answer = "The transcript does not contain an answer to this question."
+
+    # --------------------------
+    # 3) BEYOND (special case)
+    # --------------------------
+    if question.lower().startswith("beyond the transcript"):
+        # Only add general knowledge if transcript lacks info
+        if _transcript_lacks_answer(transcript_answer):
+            try:
+                general_answer = ask_general()
+                return f"Based on the video: {transcript_answer}\n\nBeyond the video: {general_answer}"
+            except Exception as e:
+                logger.error(f"Beyond supplement error: {str(e)}", exc_info=True)
+                return transcript_answer
+        else:
+            return f"Based on the video: {transcript_answer}"
+
+    # --------------------------
+    # Normal Default Mode
+    # --------------------------
+    if any(x in transcript_answer.lower() for x in ["i don't know", "i'm not sure"]):
+        return "The video doesn't specifically mention this, but it discusses: " + transcript_answer
+
+    return f"Answer: {transcript_answer}"
+
+def _transcript_lacks_answer(transcript_answer: str) -> bool:
+    return transcript_answer.startswith("The transcript does not contain") or \
+        "i don't know" in transcript_answer.lower() or \
+        "i'm not sure" in transcript_answer.lower()
+
 def get_answer(video_id: str, question: str) -> Optional[str]:
     """
     Answers a user question using:
@@ -57,29 +131,9 @@ def get_answer(video_id: str, question: str) -> Optional[str]:
         # --------------------------
         # 2) DEFAULT + BEYOND MODES (transcript-based answers)
         # --------------------------
-        # Setup embeddings and Chroma for transcript-based retrieval
-        embedding_function = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=os.getenv("GEMINI_API_KEY")
-        )
-        chroma_path = f"chroma_db/{video_id}"
-
-        if not os.path.exists(chroma_path):
-            # This is where the transcript is fetched and stored
-            # get_transcript now returns (transcript_text, language)
-            transcript_text, _ = get_transcript(video_id) 
-            if not transcript_text:
-                return "No transcript available for this video"
-            Chroma.from_texts(
-                [transcript_text], # Use the extracted text
-                embedding=embedding_function,
-                persist_directory=chroma_path
-            )
-
-        vectorstore = Chroma(
-            persist_directory=chroma_path,
-            embedding_function=embedding_function
-        )
+        vectorstore, unavailable = _open_vectorstore(video_id)
+        if vectorstore is None:
+            return unavailable
 
         # Prompt template for transcript-based QA
         prompt_template = """
@@ -104,51 +158,35 @@ FINAL ANSWER:
 """
         prompt = ChatPromptTemplate.from_template(prompt_template)
 
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=vectorstore.as_retriever(),
-            chain_type_kwargs={"prompt": prompt, "document_variable_name": "context"}
-        )
-
         # --------------------------
         # Run transcript-based QA
         # --------------------------
         logger.info(f"Processing question: {question[:50]}...")
         try:
-            result = qa_chain.invoke({"query": question})
-            transcript_answer = result.get("result", "").strip()
-
-            if not transcript_answer:
-                transcript_answer = "The transcript does not contain an answer to this question."
-
-            # --------------------------
-            # 3) BEYOND (special case)
-            # --------------------------
-            if question.lower().startswith("beyond the transcript"):
-                # Only add general knowledge if transcript lacks info
-                if transcript_answer.startswith("The transcript does not contain") or \
-                   "i don't know" in transcript_answer.lower() or \
-                   "i'm not sure" in transcript_answer.lower():
-                    try:
-                        general_resp = llm.invoke(
-                            f"Provide a helpful, factual answer using only general knowledge for this question: {question}"
-                        )
-                        general_answer = general_resp.content.strip()
-                        return f"Based on the video: {transcript_answer}\n\nBeyond the video: {general_answer}"
-                    except Exception as e:
-                        logger.error(f"Beyond supplement error: {str(e)}", exc_info=True)
-                        return transcript_answer
-                else:
-                    return f"Based on the video: {transcript_answer}"
-
-            # --------------------------
-            # Normal Default Mode
-            # --------------------------
-            if any(x in transcript_answer.lower() for x in ["i don't know", "i'm not sure"]):
-                return "The video doesn't specifically mention this, but it discusses: " + transcript_answer
-
-            return f"Answer: {transcript_answer}"
+            # Adaptive top-k, overlap merging and token-budgeted packing
+            chunks = search_chunks(vectorstore, question)
+            context, packing = pack_context(chunks)
+            messages = prompt.format_messages(context=context, question=question)
+            prompt_tokens = sum(estimate_tokens(m.content) for m in messages)
+            logger.info(
+                f"QA prompt for {video_id}: ~{prompt_tokens} tokens "
+                f"({packing['packed_blocks']}/{packing['blocks']} blocks from {packing['chunks']} chunks, "
+                f"context {packing['context_tokens']}/{packing['token_budget']})"
+            )
+
+            response = llm.invoke(messages)
+            usage = getattr(response, "usage_metadata", None)
+            if usage:
+                logger.info(f"QA token usage for {video_id}: {usage}")
+            transcript_answer = response.content.strip()
+
+            def ask_general() -> str:
+                general_resp = llm.invoke(
+                    f"Provide a helpful, factual answer using only general knowledge for this question: {question}"
+                )
+                return general_resp.content.strip()
+
+            return _finalize_answer(question, transcript_answer, ask_general)
 
         except Exception as e:
             logger.error(f"QA chain error: {str(e)}", exc_info=True)
@@ -156,4 +194,142 @@ FINAL ANSWER:
 
     except Exception as e:
         logger.error(f"QA system error: {str(e)}", exc_info=True)
-        return "System Error: Please try again later"
\ No newline at end of file
+        return "System Error: Please try again later"
+
+def _parse_batch_response(content: str, count: int) -> Optional[Dict[int, Dict]]:
+    """Parse the JSON array returned by the batch prompt into {question id: item}."""
+    text = content.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        items = json.loads(text[text.index("["):text.rindex("]") + 1])
+    except (ValueError, json.JSONDecodeError):
+        return None
+
+    parsed = {}
+    for item in items:
+        if isinstance(item, dict) and isinstance(item.get("id"), int) and 1 <= item["id"] <= count:
+            parsed[item["id"]] = item
+    return parsed if len(parsed) == count else None
+
+def get_answers_batch(video_id: str, questions: List[str]) -> List[str]:
+    """
+    Answers several questions about one video with one retrieval pass and one LLM call.
+    Questions are embedded together, their chunks are unioned into a single packed
+    context, and every answer comes back in the same format get_answer produces.
+    Falls back to get_answer per question if the combined response can't be parsed.
+    """
+    try:
+        logger.info(f"Starting batch QA processing for video {video_id} ({len(questions)} questions)")
+
+        if not video_id or len(video_id) > 100:
+            logger.error(f"Invalid video ID: {video_id}")
+            raise ValueError("Invalid video ID")
+        if not questions or len(questions) > MAX_BATCH_QUESTIONS:
+            raise ValueError(f"Between 1 and {MAX_BATCH_QUESTIONS} questions required")
+        if any(not q or len(q) > MAX_QUESTION_LENGTH for q in questions):
+            raise ValueError("Question too long or empty")
+
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-2.0-flash-lite",
+            google_api_key=os.getenv("GEMINI_API_KEY"),
+            temperature=0.3
+        )
+
+        # Buddy questions skip the transcript, the rest share one retrieval pass
+        transcript_ids = [i for i, q in enumerate(questions) if "buddy" not in q.lower()]
+        asked = list(range(len(questions)))  # indexes of the questions sent to the LLM
+        unavailable = None
+        context = ""
+        vectorstore = None
+        if transcript_ids:
+            vectorstore, unavailable = _open_vectorstore(video_id)
+            if vectorstore is None:
+                # Without an index only the general (buddy) questions can be answered
+                asked = [i for i in asked if i not in transcript_ids]
+                if not asked:
+                    return [unavailable] * len(questions)
+
+        if vectorstore is not None:
+            embeddings = vectorstore.embeddings
+            texts = [questions[i] for i in transcript_ids]
+            try:
+                vectors = embeddings.embed_documents(texts, task_type="retrieval_query")
+            except TypeError:
+                vectors = embeddings.embed_documents(texts)
+            results = [search_chunks_by_vector(vectorstore, vector) for vector in vectors]
+            context, packing = pack_context(interleave_results(results), QA_BATCH_CONTEXT_TOKEN_BUDGET)
+            logger.info(
+                f"Batch QA context for {video_id}: {packing['packed_blocks']}/{packing['blocks']} blocks "
+                f"from {packing['chunks']} chunks, {packing['context_tokens']}/{packing['token_budget']} tokens"
+            )
+
+        numbered = []
+        for i, question in enumerate((questions[j] for j in asked), start=1):
+            if "buddy" in question.lower():
+                mode = "general"
+            elif question.lower().startswith("beyond the transcript"):
+                mode = "beyond"
+            else:
+                mode = "transcript"
+            numbered.append(f'{i}. [{mode}] {question}')
+
+        prompt = f"""
+# GOAL
+Answer each numbered question below. The tag before each question sets its mode:
+- [transcript]: answer strictly from the transcript. If it has no answer, the answer is exactly
+  "The transcript does not contain an answer to this question."
+- [beyond]: like [transcript]; additionally, only when the transcript has no answer, put a helpful
+  factual answer from general knowledge in "general_answer".
+- [general]: ignore the transcript and answer naturally from general knowledge.
+
+CONTEXT:
+<transcript>
+{context}
+</transcript>
+
+QUESTIONS:
+{chr(10).join(numbered)}
+
+Respond with only a JSON array, one object per question, in order:
+[{{"id": 1, "answer": "...", "general_answer": null}}]
+"""
+        logger.info(f"Batch QA prompt for {video_id}: ~{estimate_tokens(prompt)} tokens")
+        response = llm.invoke(prompt)
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            logger.info(f"Batch QA token usage for {video_id}: {usage}")
+
+        parsed = _parse_batch_response(response.content, len(asked))
+        if parsed is None:
+            logger.warning("Could not parse batch QA response; answering questions one by one")
+            return [get_answer(video_id, q) for q in questions]
+
+        answers = [unavailable] * len(questions)
+        for i, index in enumerate(asked, start=1):
+            question = questions[index]
+            item = parsed[i]
+            answer = str(item.get("answer") or "").strip()
+            if "buddy" in question.lower():
+                answers[index] = f"Answer: {answer}"
+                continue
+            # Match the single-question prompt, whose answers start with this marker
+            if answer and not answer.startswith(("Based on the video:", "The transcript does not contain")):
+                answer = f"Based on the video: {answer}"
+            general = str(item.get("general_answer") or "").strip()
+
+            def ask_general(question=question, general=general) -> str:
+                # Asked in the same call; only a missing supplement costs an extra request
+                if general:
+                    return general
+                return llm.invoke(
+                    f"Provide a helpful, factual answer using only general knowledge for this question: {question}"
+                ).content.strip()
+
+            answers[index] = _finalize_answer(question, answer, ask_general)
+        return answers
+
+    except Exception as e:
+        logger.error(f"Batch QA system error: {str(e)}", exc_info=True)
+        return ["System Error: Please try again later"] * len(questions or [])
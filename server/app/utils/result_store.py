@@ -0,0 +1,72 @@
+#result_store.py
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+
+RESULTS_DIR = os.getenv("RESULTS_DIR", "results")
+
+logger = logging.getLogger(__name__)
+
+# video_id -> (mtime, record, etag); avoids re-reading and re-hashing unchanged files
+_record_cache: Dict[str, tuple] = {}
+_lock = threading.Lock()
+
+
+def _result_path(video_id: str) -> str:
+    return os.path.join(RESULTS_DIR, f"{video_id}.json")
+
+
+def compute_etag(payload) -> str:
+    """Strong ETag over the canonical JSON form of a payload."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def save_analysis(video_id: str, record: Dict) -> str:
+    """Persist an analysis record for a video and return its ETag."""
+    if not video_id or len(video_id) > 100:
+        raise ValueError("Invalid video ID")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = _result_path(video_id)
+    tmp_path = f"{path}.tmp"
+
+    # Write to a temp file first so readers never see a half-written record
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    etag = compute_etag(record)
+    with _lock:
+        _record_cache[video_id] = (os.path.getmtime(path), record, etag)
+    logger.debug(f"Stored analysis for {video_id} (etag {etag})")
+    return etag
+
+
+def load_analysis(video_id: str) -> Optional[tuple]:
+    """Return (record, etag) for a stored analysis, or None if there is none."""
+    path = _result_path(video_id)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _lock:
+        cached = _record_cache.get(video_id)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Could not read stored analysis for {video_id}: {e}")
+        return None
+
+    etag = compute_etag(record)
+    with _lock:
+        _record_cache[video_id] = (mtime, record, etag)
+    return record, etag
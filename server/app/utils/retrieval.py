@@ -0,0 +1,134 @@
+#retrieval.py
+import os
+import logging
+from typing import Dict, List, Tuple
+from app.utils.preprocess import estimate_tokens, truncate_to_tokens
+
+QA_MAX_K = int(os.getenv("QA_MAX_K", "12"))  # candidates fetched before adaptive cut-off
+QA_MIN_K = int(os.getenv("QA_MIN_K", "2"))
+QA_SCORE_GAP = float(os.getenv("QA_SCORE_GAP", "0.3"))  # share of the score spread that counts as a cliff
+QA_CONTEXT_TOKEN_BUDGET = int(os.getenv("QA_CONTEXT_TOKEN_BUDGET", "1500"))
+
+logger = logging.getLogger(__name__)
+
+
+def adaptive_top_k(results: List[Tuple], min_k: int = QA_MIN_K, gap_ratio: float = QA_SCORE_GAP) -> List[Tuple]:
+    """
+    Cut (document, distance) results at the largest jump in distance, if that
+    jump is a big enough share of the overall spread. Keeps at least min_k.
+    """
+    results = sorted(results, key=lambda r: r[1])
+    if len(results) <= min_k:
+        return results
+
+    spread = results[-1][1] - results[0][1]
+    if spread <= 0:
+        return results
+
+    largest_gap, cut_at = 0.0, len(results)
+    for i in range(min_k, len(results)):
+        gap = (results[i][1] - results[i - 1][1]) / spread
+        if gap > largest_gap:
+            largest_gap, cut_at = gap, i
+    return results[:cut_at] if largest_gap >= gap_ratio else results
+
+
+def search_chunks(vectorstore, question: str, max_k: int = QA_MAX_K) -> List[Tuple]:
+    """Fetch up to max_k chunks for a question and keep the adaptive top-k."""
+    results = vectorstore.similarity_search_with_score(question, k=max_k)
+    return adaptive_top_k(results)
+
+
+def search_chunks_by_vector(vectorstore, embedding: List[float], max_k: int = QA_MAX_K) -> List[Tuple]:
+    """Same as search_chunks for a question that was already embedded."""
+    # Chroma returns raw distances here, like similarity_search_with_score
+    results = vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=max_k)
+    return adaptive_top_k(results)
+
+
+def interleave_results(result_lists: List[List[Tuple]]) -> List[Tuple]:
+    """
+    Union of several questions' results, ranked round-robin (every question's
+    best chunk first, then every second-best...) so no question crowds out the
+    others when the context is packed. Duplicate chunks keep their best rank.
+    """
+    union, seen = [], set()
+    for rank in range(max((len(r) for r in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            doc, score = results[rank]
+            key = doc.metadata.get("start_index") if doc.metadata else None
+            key = key if key is not None else doc.page_content
+            if key in seen:
+                continue
+            seen.add(key)
+            union.append((doc, score))
+    return union
+
+
+def _merge_blocks(results: List[Tuple]) -> List[Dict]:
+    """
+    Turn ranked chunks into non-overlapping text blocks. Chunks with a known
+    start offset are merged with overlapping or adjacent neighbours; the rest
+    are only de-duplicated.
+    """
+    positioned, loose = [], []
+    for rank, (doc, _) in enumerate(results):
+        start = doc.metadata.get("start_index") if doc.metadata else None
+        if start is None:
+            loose.append((rank, doc.page_content))
+        else:
+            positioned.append((start, start + len(doc.page_content), rank, doc.page_content))
+
+    blocks = []
+    for start, end, rank, text in sorted(positioned):
+        if blocks and start <= blocks[-1]["end"] + 1:
+            current = blocks[-1]
+            if end > current["end"]:
+                # Drop the overlapping prefix the splitter repeated from the previous chunk
+                overlap = current["end"] - start
+                current["text"] += (" " if overlap < 0 else "") + text[max(overlap, 0):]
+                current["end"] = end
+            current["rank"] = min(current["rank"], rank)
+        else:
+            blocks.append({"start": start, "end": end, "rank": rank, "text": text})
+
+    seen = {b["text"] for b in blocks}
+    for rank, text in loose:
+        if text in seen:
+            continue
+        seen.add(text)
+        blocks.append({"start": None, "end": None, "rank": rank, "text": text})
+    return blocks
+
+
+def pack_context(results: List[Tuple], token_budget: int = QA_CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """
+    Pack the most relevant blocks into at most token_budget tokens and return
+    them in transcript order. An oversized block (e.g. a whole transcript stored
+    as one document) is truncated to fit.
+    """
+    blocks = _merge_blocks(results)
+    packed, used = [], 0
+    for block in sorted(blocks, key=lambda b: b["rank"]):
+        cost = estimate_tokens(block["text"])
+        remaining = token_budget - used
+        if cost > remaining:
+            if packed or remaining <= 0:
+                continue
+            block = {**block, "text": truncate_to_tokens(block["text"], remaining)}
+            cost = estimate_tokens(block["text"])
+        packed.append(block)
+        used += cost
+
+    packed.sort(key=lambda b: (b["start"] is None, b["start"] or 0, b["rank"]))
+    context = "\n\n".join(b["text"] for b in packed)
+    stats = {
+        "chunks": len(results),
+        "blocks": len(blocks),
+        "packed_blocks": len(packed),
+        "context_tokens": used,
+        "token_budget": token_budget,
+    }
+    return context, stats
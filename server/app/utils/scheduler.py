@@ -0,0 +1,219 @@
+#scheduler.py
+import os
+import time
+import asyncio
+import logging
+import contextvars
+import functools
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Lane configuration: (concurrency, max queued requests, max in-flight per client)
+LANE_CONFIG = {
+    "transcription": (
+        int(os.getenv("LANE_TRANSCRIPTION_CONCURRENCY", "1")),
+        int(os.getenv("LANE_TRANSCRIPTION_QUEUE", "4")),
+        int(os.getenv("LANE_TRANSCRIPTION_PER_CLIENT", "1")),
+    ),
+    "llm": (
+        int(os.getenv("LANE_LLM_CONCURRENCY", "2")),
+        int(os.getenv("LANE_LLM_QUEUE", "16")),
+        int(os.getenv("LANE_LLM_PER_CLIENT", "4")),
+    ),
+    "qa": (
+        int(os.getenv("LANE_QA_CONCURRENCY", "4")),
+        int(os.getenv("LANE_QA_QUEUE", "32")),
+        int(os.getenv("LANE_QA_PER_CLIENT", "4")),
+    ),
+}
+WAIT_SAMPLE_SIZE = 200
+# Comma-separated proxy addresses whose X-Forwarded-For is trusted; empty = use the peer address
+TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip()}
+
+
+class LaneOverloaded(Exception):
+    """Raised when a lane rejects a request instead of queueing it."""
+
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(f"{lane} lane overloaded: {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lane:
+    """
+    Bounded worker lane with a fair (round-robin per client) wait queue.
+    Requests beyond the queue size or the per-client limit are rejected up front.
+    Each lane runs its work on its own threads, so a granted slot never waits
+    behind another lane's threads.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, max_per_client: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_per_client = max(1, max_per_client)
+        self._active = 0
+        self._queued = 0
+        self._waiters: "OrderedDict[str, deque]" = OrderedDict()
+        self._per_client: Dict[str, int] = defaultdict(int)
+        self._wait_times = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._avg_service_time = 1.0
+        self._completed = 0
+        self._rejected = 0
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"lane-{name}")
+
+    def _retry_after(self) -> int:
+        """Rough seconds until a slot frees up, from the average service time."""
+        backlog = (self._queued + 1) / self.concurrency
+        return max(1, int(round(backlog * self._avg_service_time)))
+
+    def _reject(self, reason: str):
+        self._rejected += 1
+        retry_after = self._retry_after()
+        logger.warning(f"Rejecting request on {self.name} lane ({reason}), retry after {retry_after}s")
+        raise LaneOverloaded(self.name, reason, retry_after)
+
+    async def acquire(self, client_id: str, admit: bool = True):
+        """
+        Wait for a slot. With admit=True the queue and per-client limits apply;
+        admit=False is for later stages of work that was already admitted.
+        """
+        # .get: clients that are only checked (or rejected) must not leave entries behind
+        if admit and self._per_client.get(client_id, 0) >= self.max_per_client:
+            self._reject("too many requests from client")
+
+        if self._active < self.concurrency and self._queued == 0:
+            self._active += 1
+            self._per_client[client_id] += 1
+            self._wait_times.append(0.0)
+            return
+
+        if admit and self._queued >= self.max_queue:
+            self._reject("queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client_id, deque()).append(future)
+        self._queued += 1
+        self._per_client[client_id] += 1
+        queued_at = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just as we were cancelled; give it back
+                self._active -= 1
+                self._dispatch()
+            else:
+                self._remove_waiter(client_id, future)
+            self._drop_client(client_id)
+            raise
+        self._wait_times.append(time.monotonic() - queued_at)
+
+    def release(self, client_id: str, service_time: float):
+        self._active -= 1
+        self._completed += 1
+        self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+        self._drop_client(client_id)
+        self._dispatch()
+
+    def _drop_client(self, client_id: str):
+        self._per_client[client_id] -= 1
+        if self._per_client[client_id] <= 0:
+            del self._per_client[client_id]
+
+    def _remove_waiter(self, client_id: str, future):
+        waiters = self._waiters.get(client_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiters[client_id]
+
+    def _dispatch(self):
+        """Hand free slots to waiting clients in round-robin order."""
+        while self._active < self.concurrency and self._waiters:
+            client_id, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiters.move_to_end(client_id)
+            else:
+                del self._waiters[client_id]
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+
+    def metrics(self) -> Dict:
+        waits = sorted(self._wait_times)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "queued": self._queued,
+            "max_queue": self.max_queue,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "queue_wait_ms_p50": percentile(0.50),
+            "queue_wait_ms_p95": percentile(0.95),
+            "avg_service_ms": round(self._avg_service_time * 1000, 1),
+        }
+
+
+_lanes: Dict[str, Lane] = {
+    name: Lane(name, *config) for name, config in LANE_CONFIG.items()
+}
+
+
+async def run_in_lane(name: str, client_id: str, func: Callable, *args, admit: bool = True, **kwargs):
+    """
+    Run a blocking function in a worker thread once the lane grants a slot.
+    The slot is released when the thread finishes, not when the caller stops
+    waiting: a cancelled request cannot stop the thread, so it keeps the slot.
+    """
+    lane = _lanes[name]
+    await lane.acquire(client_id, admit=admit)
+    started = time.monotonic()
+
+    def on_done(future: asyncio.Future):
+        lane.release(client_id, time.monotonic() - started)
+        if not future.cancelled():
+            future.exception()  # retrieved here in case the caller is gone
+
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    try:
+        future = asyncio.get_running_loop().run_in_executor(lane.executor, call)
+    except BaseException:
+        lane.release(client_id, time.monotonic() - started)
+        raise
+    future.add_done_callback(on_done)
+    return await asyncio.shield(future)
+
+
+def get_client_id(request) -> str:
+    """
+    Identify the caller for fairness. X-Forwarded-For is only honoured when the
+    peer is one of TRUSTED_PROXIES; the client is then the nearest untrusted hop.
+    """
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded or peer not in TRUSTED_PROXIES:
+        return peer
+    for hop in reversed([h.strip() for h in forwarded.split(",") if h.strip()]):
+        if hop not in TRUSTED_PROXIES:
+            return hop
+    return peer
+
+
+def get_scheduler_metrics() -> Dict:
+    return {name: lane.metrics() for name, lane in _lanes.items()}
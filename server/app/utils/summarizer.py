@@ -6,6 +6,7 @@ from typing import List, Dict
 from datetime import datetime, timedelta
 import time
 import hashlib
+import threading
 
 # Configuration
 MODEL_NAME = "gemini-2.0-flash-lite"  # Best free tier model
@@ -16,6 +17,7 @@ CACHE_TTL = 3600  # 1 hour
 # State tracking
 _last_request_time = 0
 _request_count = 0
+_rate_limit_lock = threading.Lock()  # the llm lane calls Gemini from several threads
 _summary_cache = {}
 _key_points_cache = {}
 
@@ -33,11 +35,12 @@ def normalize_bullets(points: List[str]) -> List[str]:
 def _rate_limit():
     """Throttle API calls to avoid hitting Gemini's quota."""
     global _last_request_time, _request_count
-    elapsed = time.time() - _last_request_time
-    if elapsed < RATE_LIMIT_DELAY:
-        time.sleep(RATE_LIMIT_DELAY - elapsed)
-    _last_request_time = time.time()
-    _request_count += 1
+    with _rate_limit_lock:
+        elapsed = time.time() - _last_request_time
+        if elapsed < RATE_LIMIT_DELAY:
+            time.sleep(RATE_LIMIT_DELAY - elapsed)
+        _last_request_time = time.time()
+        _request_count += 1
 
 def _get_cache_key(text: str) -> str:
     """Generate cache key based on transcript content."""
@@ -111,6 +114,50 @@ def generate_summary(transcript: str) -> str:
         logging.error(f"Summarization failed: {e}", exc_info=True)
         return "Error generating summary."
 
+def generate_chunk_summary(chunk: str) -> str:
+    """Short summary of one section of a transcript (map step of streaming ingest)."""
+    try:
+        if not chunk or len(chunk.strip()) < 50:
+            return chunk.strip() if chunk else ""
+
+        if len(chunk) > MAX_TRANSCRIPT_LENGTH:
+            chunk = chunk[:MAX_TRANSCRIPT_LENGTH]
+
+        gemini_key = os.getenv("GEMINI_API_KEY")
+        if not gemini_key:
+            raise ValueError("Gemini API key not configured.")
+
+        cache_key = _get_cache_key("chunk:" + chunk)
+        if cache_key in _summary_cache and _summary_cache[cache_key]['expires_at'] > datetime.now():
+            return _summary_cache[cache_key]['summary']
+
+        prompt = ChatPromptTemplate.from_template("""
+            Summarize this section of a YouTube video transcript in 3-4 sentences.
+            Keep names, numbers and conclusions; drop filler and repetition.
+
+            Section:
+            {transcript}
+        """)
+
+        llm = ChatGoogleGenerativeAI(
+            model=MODEL_NAME,
+            google_api_key=gemini_key,
+            temperature=0.3
+        )
+        chain = prompt | llm
+        summary = _call_gemini_with_retry(chain, {"transcript": chunk}).strip()
+
+        _summary_cache[cache_key] = {
+            "summary": summary,
+            "expires_at": datetime.now() + timedelta(seconds=CACHE_TTL)
+        }
+        return summary
+
+    except Exception as e:
+        # The reduce step still has the raw section text to fall back on
+        logging.error(f"Chunk summarization failed: {e}", exc_info=True)
+        return ""
+
 def generate_key_points(transcript: str) -> List[str]:
     """Generate normalized bullet-point key points from the transcript."""
     try:
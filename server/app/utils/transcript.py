@@ -1,23 +1,113 @@
 import re
 import time
 import logging
-from typing import Optional, Tuple
+from typing import Callable, Dict, List, Optional
 import yt_dlp
-import tempfile
 import os
 import whisper
+import threading
+from collections import OrderedDict
+from app.utils.checkpoint import (
+    source_dir, job_lock, load_checkpoint, save_checkpoint, new_checkpoint,
+    load_probe, save_probe, remove_audio, cleanup_checkpoints
+)
 
 logger = logging.getLogger(__name__)
 
 WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "tiny.en") 
-whisper_model = None
+TRANSCRIBE_WINDOW_SECONDS = int(os.getenv("TRANSCRIBE_WINDOW_SECONDS", "300"))  # checkpoint granularity
+
+# Language-aware model selection: a small multilingual model listens to the first
+# PROBE_SECONDS and the cheapest model for that language at the quality tier is used.
+WHISPER_AUTO_MODEL = os.getenv("WHISPER_AUTO_MODEL", "true").lower() == "true"
+WHISPER_PROBE_MODEL = os.getenv("WHISPER_PROBE_MODEL", "tiny")
+WHISPER_QUALITY_TIER = os.getenv("WHISPER_QUALITY_TIER", "fast")  # fast | balanced | accurate
+WHISPER_MODEL_CACHE_SIZE = int(os.getenv("WHISPER_MODEL_CACHE_SIZE", "2"))
+PROBE_SECONDS = 30
+
+# Languages Whisper handles well with small models; the rest need a size up
+WELL_SUPPORTED_LANGUAGES = {"es", "fr", "de", "it", "pt", "nl", "ru", "ja", "zh", "ko", "pl", "tr", "ca", "sv"}
+MODEL_TIERS = {
+    "en": {"fast": WHISPER_MODEL_SIZE, "balanced": "base.en", "accurate": "small.en"},
+    "well_supported": {"fast": "base", "balanced": "small", "accurate": "medium"},
+    "other": {"fast": "small", "balanced": "medium", "accurate": "large"},
+}
+
+_model_cache: "OrderedDict[str, object]" = OrderedDict()
+_pinned_models: Dict[str, object] = {}  # the probe model; runs for every new video, so never evicted
+_model_cache_lock = threading.Lock()
+_model_load_locks: Dict[str, threading.Lock] = {}
+
+def _cached_model(model_name: str, pin: bool):
+    """Look a model up in the cache (caller holds _model_cache_lock)."""
+    if model_name in _pinned_models:
+        return _pinned_models[model_name]
+    if model_name not in _model_cache:
+        return None
+    if pin:
+        _pinned_models[model_name] = _model_cache.pop(model_name)
+        return _pinned_models[model_name]
+    _model_cache.move_to_end(model_name)
+    return _model_cache[model_name]
+
+def get_whisper_model(model_name: str, pin: bool = False):
+    """
+    Load a Whisper model on first use and keep the most recent few in memory.
+    pin=True keeps the model outside the LRU (used for the language probe model).
+    Loading happens under a per-model lock, so other models stay available meanwhile.
+    """
+    with _model_cache_lock:
+        model = _cached_model(model_name, pin)
+        if model is not None:
+            return model
+        load_lock = _model_load_locks.setdefault(model_name, threading.Lock())
+
+    with load_lock:
+        with _model_cache_lock:
+            model = _cached_model(model_name, pin)
+        if model is not None:
+            return model
+
+        logger.info(f"Loading Whisper model: {model_name}...")
+        model = whisper.load_model(model_name)
+        with _model_cache_lock:
+            if pin:
+                _pinned_models[model_name] = model
+            else:
+                _model_cache[model_name] = model
+                while len(_model_cache) > max(1, WHISPER_MODEL_CACHE_SIZE):
+                    evicted, _ = _model_cache.popitem(last=False)
+                    logger.info(f"Evicted Whisper model {evicted} from cache")
+        logger.info(f"Whisper model {model_name} loaded successfully.")
+        return model
+
+def select_model(language: str, tier: str = WHISPER_QUALITY_TIER) -> str:
+    """Cheapest model meeting the quality tier for a language."""
+    if language == "en":
+        group = "en"
+    elif language in WELL_SUPPORTED_LANGUAGES:
+        group = "well_supported"
+    else:
+        group = "other"
+    tiers = MODEL_TIERS[group]
+    return tiers.get(tier, tiers["fast"])
+
+def probe_language(audio) -> Dict:
+    """Detect the spoken language from the first PROBE_SECONDS of audio."""
+    model = get_whisper_model(WHISPER_PROBE_MODEL, pin=True)
+    if not model.is_multilingual:
+        return {"language": "en", "probability": None}
+
+    clip = whisper.pad_or_trim(audio[:PROBE_SECONDS * whisper.audio.SAMPLE_RATE])
+    mel = whisper.log_mel_spectrogram(clip, n_mels=model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    language = max(probs, key=probs.get)
+    return {"language": language, "probability": round(float(probs[language]), 3)}
 
 def load_whisper_model_on_startup():
-    global whisper_model
-    logger.info(f"Loading Whisper model: {WHISPER_MODEL_SIZE}...")
+    # Preload the English fast-path model; others are loaded lazily per video
     try:
-        whisper_model = whisper.load_model(WHISPER_MODEL_SIZE) 
-        logger.info(f"Whisper model {WHISPER_MODEL_SIZE} loaded successfully.")
+        get_whisper_model(select_model("en") if WHISPER_AUTO_MODEL else WHISPER_MODEL_SIZE)
     except Exception as e:
         logger.error(f"ERROR: Could not load Whisper model {WHISPER_MODEL_SIZE}: {e}")
 
@@ -67,57 +157,190 @@ def get_video_id(url: str) -> str:
     raise ValueError(f"Could not extract video ID from URL: {url}")
 
 
-def get_transcript(url: str) -> Tuple[str, str]:
+def _clean_segments(segments: List[dict]) -> List[Dict]:
+    """Keep only the timing and text of Whisper segments."""
+    return [
+        {
+            "start": round(float(seg.get("start", 0.0)), 2),
+            "end": round(float(seg.get("end", 0.0)), 2),
+            "text": seg.get("text", "").strip()
+        }
+        for seg in segments
+    ]
+
+
+def _download_audio(url: str, directory: str) -> str:
+    """Download audio into the video's source directory, reusing a previous download if present."""
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith("audio") and not name.endswith(".part") and os.path.getsize(path) > 0:
+            logger.info(f"Reusing downloaded audio {path}")
+            return path
+
+    audio_path = os.path.join(directory, "audio.m4a")
+    FFMPEG_BIN_PATH = r"C:\Users\ayush\OneDrive\Desktop\ffmpeg-master-latest-win64-gpl-shared\bin" # YOUR FFMPEG PATH
+
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'extract_audio': True,
+        'audioformat': 'm4a',
+        'outtmpl': audio_path,
+        'quiet': True,
+        'no_warnings': True,
+        'logger': logging.getLogger('yt_dlp'),
+        'ffmpeg_location': FFMPEG_BIN_PATH,
+        'postprocessor_args': {
+            'FFmpegExtractAudio': ['-acodec', 'aac'],
+        },
+        'keepvideo': False,
+        'cachedir': False, # ADD THIS LINE: Disable cache for this run
+        'no_cache_dir': True, # ADD THIS LINE: Do not use any cache directory
+        'overwrites': True, # ADD THIS LINE: Always overwrite existing files
+    }
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        logger.debug(f"Downloading and processing audio for {url} using yt-dlp to {audio_path}...")
+        ydl.download([url])
+
+    if not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0:
+        raise ValueError("Downloaded audio file is empty or missing.")
+    return audio_path
+
+
+def _emit(on_segments: Optional[Callable], segments: List[Dict], language: Optional[str]):
+    """Hand new segments (and the detected language) to a streaming consumer; its failures never stop transcription."""
+    if on_segments is None or not segments:
+        return
+    try:
+        on_segments(segments, language)
+    except Exception as e:
+        logger.error(f"Segment consumer failed: {e}", exc_info=True)
+
+
+def _transcribe_windows(model, audio, checkpoint: Dict, video_id: str, model_name: str,
+                        on_segments: Optional[Callable] = None):
     """
-    Downloads audio from YouTube using yt-dlp and transcribes it using a local Whisper model.
-    Returns the transcript text and detected language.
+    Transcribe the audio window by window, checkpointing after each one.
+    Starts from checkpoint['next_offset'], so an interrupted job resumes there.
+    Each window's segments are passed to on_segments as soon as they are checkpointed.
+    """
+    sample_rate = whisper.audio.SAMPLE_RATE
+    total_samples = len(audio)
+    duration = total_samples / sample_rate
+    checkpoint["duration"] = round(duration, 2)
+    window_samples = checkpoint["window_seconds"] * sample_rate
+
+    offset = checkpoint["next_offset"]
+    if offset > 0:
+        logger.info(f"Resuming transcription of {video_id} at {offset:.0f}s of {duration:.0f}s")
+
+    # Windows are cut in whole samples and seconds are only derived from them,
+    # so rounding can never leave a sliver of audio the loop keeps re-reading
+    start_sample = min(int(round(offset * sample_rate)), total_samples)
+    while start_sample < total_samples:
+        end_sample = min(start_sample + window_samples, total_samples)
+        offset = start_sample / sample_rate
+        previous = checkpoint["segments"][-1]["text"] if checkpoint["segments"] else None
+
+        result = model.transcribe(
+            audio[start_sample:end_sample],
+            language=checkpoint["language"],
+            initial_prompt=previous  # keeps context across window boundaries
+        )
+        if checkpoint["language"] is None:
+            checkpoint["language"] = result.get("language", "unknown")
+
+        new_segments = _clean_segments(result.get("segments", []))
+        for seg in new_segments:
+            seg["start"] = round(seg["start"] + offset, 2)
+            seg["end"] = round(seg["end"] + offset, 2)
+        checkpoint["segments"].extend(new_segments)
+
+        start_sample = end_sample
+        offset = end_sample / sample_rate  # unrounded, so a resume maps back to the same sample
+        checkpoint["next_offset"] = offset
+        save_checkpoint(video_id, model_name, checkpoint)
+        _emit(on_segments, new_segments, checkpoint["language"])
+        logger.debug(f"Checkpointed {video_id} at {offset:.0f}s of {duration:.0f}s")
+
+
+def transcribe_video(url: str, on_segments: Optional[Callable[[List[Dict], Optional[str]], None]] = None) -> Dict:
     """
-    if whisper_model is None:
-        raise ValueError("Whisper model is not loaded. Check server startup logs.")
+    Downloads audio from YouTube using yt-dlp and transcribes it using a local Whisper model.
+    Returns a dict with 'text', 'language', 'model' and 'segments' ({start, end, text}).
 
+    Progress is checkpointed per audio window, so a retry for the same video and
+    model resumes from the last completed window instead of starting over.
+    If on_segments is given it receives segments as they become available
+    (checkpointed ones first), so callers can stream them into later stages.
+    """
     try:
         logger.info(f"Starting audio download and transcription for URL: {url}")
         
         video_id = get_video_id(url)
-        
-        with tempfile.NamedTemporaryFile(suffix=".m4a", delete=True) as temp_audio_file:
-            FFMPEG_BIN_PATH = r"C:\Users\ayush\OneDrive\Desktop\ffmpeg-master-latest-win64-gpl-shared\bin" # YOUR FFMPEG PATH
-
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'extract_audio': True,
-                'audioformat': 'm4a',
-                'outtmpl': temp_audio_file.name,
-                'quiet': True,
-                'no_warnings': True,
-                'logger': logging.getLogger('yt_dlp'),
-                'ffmpeg_location': FFMPEG_BIN_PATH,
-                'postprocessor_args': {
-                    'FFmpegExtractAudio': ['-acodec', 'aac'],
-                },
-                'keepvideo': False,
-                'cachedir': False, # ADD THIS LINE: Disable cache for this run
-                'no_cache_dir': True, # ADD THIS LINE: Do not use any cache directory
-                'overwrites': True, # ADD THIS LINE: Always overwrite existing files
-            }
+        cleanup_checkpoints()
+
+        with job_lock(video_id):
+            probe = load_probe(video_id) if WHISPER_AUTO_MODEL else None
+            if probe and probe.get("tier") != WHISPER_QUALITY_TIER:
+                # The detected language still holds; only the model choice follows the new tier
+                probe["model"] = select_model(probe["language"])
+                probe["tier"] = WHISPER_QUALITY_TIER
+                save_probe(video_id, probe)
+                logger.info(f"Quality tier changed for {video_id}, using model {probe['model']}")
+            model_name = probe["model"] if probe else WHISPER_MODEL_SIZE
+            checkpoint = None
+            if probe or not WHISPER_AUTO_MODEL:
+                checkpoint = load_checkpoint(video_id, model_name)
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                logger.debug(f"Downloading and processing audio for {url} using yt-dlp to {temp_audio_file.name}...")
-                ydl.download([url])
+            if checkpoint is None or not checkpoint["completed"]:
+                directory = source_dir(video_id)
+                os.makedirs(directory, exist_ok=True)
+                audio_path = _download_audio(url, directory)
+                logger.info("Audio downloaded and processed. Starting transcription with local Whisper model...")
+                audio = whisper.load_audio(audio_path)
 
-            logger.info("Audio downloaded and processed. Starting transcription with local Whisper model...")
+                if WHISPER_AUTO_MODEL and probe is None:
+                    probe = probe_language(audio)
+                    probe["model"] = select_model(probe["language"])
+                    probe["tier"] = WHISPER_QUALITY_TIER
+                    save_probe(video_id, probe)
+                    model_name = probe["model"]
+                    logger.info(
+                        f"Language probe for {video_id}: {probe['language']} "
+                        f"(p={probe['probability']}), using model {model_name}"
+                    )
+                    checkpoint = load_checkpoint(video_id, model_name)
 
-            if not os.path.exists(temp_audio_file.name) or os.path.getsize(temp_audio_file.name) == 0:
-                raise ValueError("Downloaded audio file is empty or missing.")
+                if checkpoint is None or checkpoint.get("window_seconds") != TRANSCRIBE_WINDOW_SECONDS:
+                    checkpoint = new_checkpoint(video_id, model_name, TRANSCRIBE_WINDOW_SECONDS)
+                if probe and checkpoint["language"] is None:
+                    checkpoint["language"] = probe["language"]
 
-            result = whisper_model.transcribe(temp_audio_file.name)
+                _emit(on_segments, list(checkpoint["segments"]), checkpoint["language"])
+                _transcribe_windows(
+                    get_whisper_model(model_name), audio, checkpoint, video_id, model_name, on_segments
+                )
 
-            transcript_text = result["text"]
-            detected_language = result.get('language', 'unknown')
+                checkpoint["completed"] = True
+                save_checkpoint(video_id, model_name, checkpoint)
+                remove_audio(video_id)
+            else:
+                logger.info(f"Using completed transcription checkpoint for {video_id}")
+                _emit(on_segments, list(checkpoint["segments"]), checkpoint["language"])
 
-            logger.info(f"Successfully transcribed video {video_id}. Detected language: {detected_language}")
-            return transcript_text, detected_language
+            segments = checkpoint["segments"]
+            transcript_text = " ".join(seg["text"] for seg in segments)
+            detected_language = checkpoint["language"] or "unknown"
+
+            logger.info(f"Successfully transcribed video {video_id} with {model_name}. Detected language: {detected_language}")
+            return {
+                "text": transcript_text,
+                "language": detected_language,
+                "model": model_name,
+                "segments": segments
+            }
             
     except Exception as e:
         logger.error(f"Error processing transcript with local Whisper (via yt-dlp): {e}", exc_info=True)
-        raise ValueError(f"Failed to fetch or transcribe audio: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Failed to fetch or transcribe audio: {str(e)}")
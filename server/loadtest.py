@@ -0,0 +1,472 @@
+"""
+Async load generator for the YTBuddy API.
+
+Drives /api/analyze, /api/ask and the /api/ws/status WebSocket either
+in-process (the ASGI app with yt-dlp, Whisper, Gemini and the embeddings
+replaced by configurable-latency fakes) or against a running server.
+
+Examples:
+    python loadtest.py --profile ask=90,analyze=10 --stages 10:5,30:20,30:50
+    python loadtest.py --url http://127.0.0.1:8000 --profile ask=100 --stages 60:10
+
+Virtual users are told apart by X-Forwarded-For, so a server targeted with
+--url needs TRUSTED_PROXIES=127.0.0.1 to keep per-client fairness visible.
+"""
+import os
+import sys
+import json
+import time
+import random
+import string
+import asyncio
+import logging
+import argparse
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+OPERATIONS = ("ask", "analyze", "ws")
+# /api/ask answers that are failures despite a 200 response
+ASK_ERROR_PREFIXES = ("System Error", "I couldn't process")
+# /api/ask answers for videos without an index yet; fast shortcuts, reported apart
+ASK_NOT_READY_PREFIXES = ("This video has not been analyzed yet", "This video is still being transcribed")
+
+
+# --------------------------
+# Fake backends (in-process mode only)
+# --------------------------
+class FakeLatency:
+    """Sleep for a base latency with uniform +/- jitter (fraction of the base)."""
+
+    def __init__(self, base: float, jitter: float):
+        self.base = base
+        self.jitter = jitter
+
+    def sleep(self):
+        if self.base > 0:
+            time.sleep(max(0.0, self.base * (1 + random.uniform(-self.jitter, self.jitter))))
+
+
+def install_fakes(args):
+    """Swap the external backends for fakes. Must run before the app is imported."""
+    import whisper
+    import yt_dlp
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models.chat_models import SimpleChatModel
+
+    download = FakeLatency(args.ytdlp_latency, args.jitter)
+    window = FakeLatency(args.whisper_latency, args.jitter)
+    gemini = FakeLatency(args.gemini_latency, args.jitter)
+    embed = FakeLatency(args.embed_latency, args.jitter)
+
+    class FakeYoutubeDL:
+        def __init__(self, opts):
+            self.outtmpl = opts["outtmpl"]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def download(self, urls):
+            download.sleep()
+            with open(self.outtmpl, "wb") as f:
+                f.write(b"\0" * 1024)
+
+    class FakeAudio:
+        """Stands in for the decoded waveform; only length and slicing are used."""
+
+        def __init__(self, samples: int):
+            self.samples = samples
+
+        def __len__(self):
+            return self.samples
+
+        def __getitem__(self, item):
+            return FakeAudio(len(range(self.samples)[item]))
+
+        def to(self, device):
+            return self
+
+    class FakeWhisperModel:
+        is_multilingual = True
+        device = "cpu"
+        dims = type("Dims", (), {"n_mels": 80})()
+
+        def detect_language(self, mel):
+            return None, {"en": 0.9, "es": 0.1}
+
+        def transcribe(self, audio, **kwargs):
+            window.sleep()
+            seconds = len(audio) / whisper.audio.SAMPLE_RATE if isinstance(audio, FakeAudio) else 30.0
+            segments = [
+                {"start": float(t), "end": float(min(t + 5, seconds)),
+                 "text": f"Fake sentence about topic {random.randint(1, 50)} spoken at {t} seconds."}
+                for t in range(0, int(seconds), 5)
+            ]
+            return {"text": " ".join(s["text"] for s in segments), "language": "en", "segments": segments}
+
+    class FakeChatModel(SimpleChatModel):
+        @property
+        def _llm_type(self) -> str:
+            return "fake-gemini"
+
+        def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+            gemini.sleep()
+            return "Based on the video: a fake answer.\n• Point one\n• Point two\n• Point three"
+
+    class FakeEmbeddings(Embeddings):
+        def _vector(self, text: str) -> List[float]:
+            rng = random.Random(text)
+            return [rng.uniform(-1, 1) for _ in range(64)]
+
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            embed.sleep()
+            return [self._vector(t) for t in texts]
+
+        def embed_query(self, text: str) -> List[float]:
+            embed.sleep()
+            return self._vector(text)
+
+    yt_dlp.YoutubeDL = FakeYoutubeDL
+    # A few extra samples so the last window is a fraction of a second, as with real audio
+    whisper.load_audio = lambda path: FakeAudio(
+        int(args.video_duration * whisper.audio.SAMPLE_RATE) + random.randint(1, whisper.audio.SAMPLE_RATE - 1)
+    )
+    whisper.load_model = lambda name, *a, **kw: FakeWhisperModel()
+    whisper.pad_or_trim = lambda audio, *a, **kw: audio
+    whisper.log_mel_spectrogram = lambda audio, *a, **kw: audio
+
+    from app.utils import summarizer, embed_store, qa
+    summarizer.ChatGoogleGenerativeAI = lambda **kw: FakeChatModel()
+    qa.ChatGoogleGenerativeAI = lambda **kw: FakeChatModel()
+    embed_store.GoogleGenerativeAIEmbeddings = lambda **kw: FakeEmbeddings()
+    qa.GoogleGenerativeAIEmbeddings = lambda **kw: FakeEmbeddings()
+    if args.no_rate_limit:
+        summarizer.RATE_LIMIT_DELAY = 0
+
+
+def load_app(args):
+    """Import the FastAPI app inside a scratch working directory with fakes installed."""
+    workdir = tempfile.mkdtemp(prefix="ytbuddy-loadtest-")
+    server_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, server_dir)
+    os.chdir(workdir)  # chroma_db/, results/, checkpoints/ and logs/ all land here
+    os.environ.setdefault("GEMINI_API_KEY", "loadtest-fake-key")
+    os.environ.setdefault("TRUSTED_PROXIES", "127.0.0.1")  # ASGITransport's peer; keeps X-Forwarded-For
+
+    install_fakes(args)
+    from main import app
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"In-process app with fake backends (scratch dir: {workdir})")
+    return app
+
+
+# --------------------------
+# Traffic
+# --------------------------
+def random_video_id() -> str:
+    return "".join(random.choices(string.ascii_letters + string.digits + "_-", k=11))
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.status: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.loop_lag: List[float] = []
+        self.started = time.monotonic()
+
+    def record(self, op: str, latency: float, status: str):
+        if status == "not_ready":
+            # Separate row, so the shortcut answer does not flatter the op's latencies
+            op = f"{op}_not_ready"
+        self.samples[op].append(latency)
+        self.status[op][status] += 1
+
+
+class Client:
+    """Issues requests either to the in-process ASGI app or to a remote base URL."""
+
+    def __init__(self, app=None, url: Optional[str] = None, timeout: float = 600.0):
+        import httpx
+        self.app = app
+        self.url = url
+        if app is not None:
+            transport = httpx.ASGITransport(app=app)
+            self.http = httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=timeout)
+        else:
+            self.http = httpx.AsyncClient(base_url=url, timeout=timeout)
+
+    async def close(self):
+        await self.http.aclose()
+
+    async def analyze(self, video_id: str, client_ip: str) -> str:
+        response = await self.http.post(
+            "/api/analyze",
+            json={"url": f"https://www.youtube.com/watch?v={video_id}"},
+            headers={"X-Forwarded-For": client_ip}
+        )
+        return str(response.status_code)
+
+    async def ask(self, video_id: str, client_ip: str) -> str:
+        response = await self.http.post(
+            "/api/ask",
+            json={"video_id": video_id, "question": "What is the main topic of the video?"},
+            headers={"X-Forwarded-For": client_ip}
+        )
+        if response.status_code == 200:
+            return self._answer_status(response) or "200"
+        return str(response.status_code)
+
+    @staticmethod
+    def _answer_status(response) -> Optional[str]:
+        """The QA pipeline reports failures and not-ready videos as a normal answer."""
+        try:
+            data = response.json()
+        except ValueError:
+            return "app_error"
+        if data.get("status") == "error":
+            return "app_error"
+        texts = [t for t in (data.get("data") or {}).values() if isinstance(t, str)]
+        if any(t.startswith(ASK_ERROR_PREFIXES) for t in texts):
+            return "app_error"
+        if any(t.startswith(ASK_NOT_READY_PREFIXES) for t in texts):
+            return "not_ready"
+        return None
+
+    async def ws_status(self, video_id: str) -> str:
+        path = f"/api/ws/status/{video_id}"
+        if self.app is not None:
+            return await self._asgi_websocket(path)
+        try:
+            import websockets
+        except ImportError:
+            raise RuntimeError("The 'websockets' package is required for ws traffic against a URL")
+        ws_url = self.url.replace("http", "ws", 1) + path
+        async with websockets.connect(ws_url) as ws:
+            async for message in ws:
+                if json.loads(message).get("status") == "completed":
+                    return "ok"
+        return "closed"
+
+    async def _asgi_websocket(self, path: str) -> str:
+        """Minimal in-process WebSocket client speaking raw ASGI messages."""
+        inbound: asyncio.Queue = asyncio.Queue()
+        await inbound.put({"type": "websocket.connect"})
+        outcome = {"status": "closed"}
+
+        async def receive():
+            return await inbound.get()
+
+        async def send(message):
+            if message["type"] == "websocket.send":
+                data = json.loads(message.get("text") or message.get("bytes"))
+                if data.get("status") == "completed":
+                    outcome["status"] = "ok"
+                    await inbound.put({"type": "websocket.disconnect", "code": 1000})
+            elif message["type"] == "websocket.close":
+                await inbound.put({"type": "websocket.disconnect", "code": message.get("code", 1000)})
+
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 0),
+            "server": ("testserver", 80),
+            "subprotocols": [],
+        }
+        await self.app(scope, receive, send)
+        return outcome["status"]
+
+
+def parse_profile(profile: str) -> Dict[str, int]:
+    weights = {}
+    for part in profile.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}' (choose from {', '.join(OPERATIONS)})")
+        weights[name] = int(weight or 1)
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError("Traffic profile needs at least one non-zero weight")
+    return weights
+
+
+def parse_stages(stages: str) -> List[tuple]:
+    """'10:5,30:20' -> [(10.0, 5), (30.0, 20)]: hold N virtual users for D seconds."""
+    parsed = []
+    for part in stages.split(","):
+        duration, _, users = part.partition(":")
+        parsed.append((float(duration), int(users)))
+    return parsed
+
+
+async def virtual_user(index: int, client: Client, weights: Dict[str, int], videos: List[str],
+                       recorder: Recorder, think_time: float, stop: asyncio.Event):
+    client_ip = f"10.0.{index // 256}.{index % 256}"
+    ops, op_weights = zip(*weights.items())
+    while not stop.is_set():
+        op = random.choices(ops, weights=op_weights)[0]
+        video_id = random.choice(videos)
+        started = time.monotonic()
+        try:
+            if op == "analyze":
+                status = await client.analyze(video_id, client_ip)
+            elif op == "ask":
+                status = await client.ask(video_id, client_ip)
+            else:
+                status = await client.ws_status(video_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status = type(e).__name__
+        recorder.record(op, time.monotonic() - started, status)
+        if think_time > 0:
+            await asyncio.sleep(random.uniform(0, 2 * think_time))
+
+
+async def monitor_loop_lag(recorder: Recorder, interval: float, stop: asyncio.Event):
+    """Measure how late the event loop wakes us up; blocking calls show up as lag."""
+    while not stop.is_set():
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        recorder.loop_lag.append(max(0.0, time.monotonic() - started - interval))
+
+
+async def warm_up(client: Client, videos: List[str]):
+    """Analyze every video before the measured stages, so asks hit an index."""
+    async def analyze(index: int, video_id: str):
+        client_ip = f"10.255.{index // 256}.{index % 256}"
+        while (status := await client.analyze(video_id, client_ip)) == "429":
+            await asyncio.sleep(1.0)
+        if not status.startswith("2"):
+            print(f"Warm-up analysis of {video_id} failed with {status}")
+
+    print(f"Warm-up: analyzing {len(videos)} videos")
+    started = time.monotonic()
+    await asyncio.gather(*(analyze(i, v) for i, v in enumerate(videos)))
+    print(f"Warm-up done in {time.monotonic() - started:.1f}s")
+
+
+async def run(args, app=None):
+    client = Client(app=app, url=args.url)
+    videos = [random_video_id() for _ in range(args.videos)]
+    if not args.no_warmup:
+        await warm_up(client, videos)
+    recorder = Recorder()  # created after the warm-up, so its clock covers only the stages
+    stop = asyncio.Event()
+    users: List[asyncio.Task] = []
+    lag_task = asyncio.create_task(monitor_loop_lag(recorder, args.lag_interval, stop))
+
+    for duration, target in args.stages:
+        while len(users) < target:
+            users.append(asyncio.create_task(
+                virtual_user(len(users), client, args.profile, videos, recorder, args.think_time, stop)
+            ))
+        while len(users) > target:
+            users.pop().cancel()
+        print(f"Stage: {target} virtual users for {duration:.0f}s")
+        await asyncio.sleep(duration)
+
+    stop.set()
+    # Let in-flight requests finish so their latencies are counted
+    done, pending = await asyncio.wait(users, timeout=args.drain_timeout) if users else (set(), set())
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, lag_task, return_exceptions=True)
+    await client.close()
+    return recorder
+
+
+# --------------------------
+# Reporting
+# --------------------------
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def build_report(recorder: Recorder, elapsed: float) -> Dict:
+    report = {"elapsed_s": round(elapsed, 2), "operations": {}}
+    for op, latencies in sorted(recorder.samples.items()):
+        statuses = dict(recorder.status[op])
+        total = len(latencies)
+        ok = sum(n for s, n in statuses.items() if s.startswith("2") or s in ("ok", "not_ready"))
+        report["operations"][op] = {
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(1 - ok / total, 4) if total else 0.0,
+            "rejected_429": statuses.get("429", 0),
+            "statuses": statuses,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round(max(latencies) * 1000, 1) if latencies else 0.0,
+        }
+    report["event_loop_lag"] = {
+        "p50_ms": round(percentile(recorder.loop_lag, 0.50) * 1000, 1),
+        "p99_ms": round(percentile(recorder.loop_lag, 0.99) * 1000, 1),
+        "max_ms": round(max(recorder.loop_lag, default=0.0) * 1000, 1),
+    }
+    return report
+
+
+def print_report(report: Dict):
+    print(f"\n=== LOAD TEST REPORT ({report['elapsed_s']}s) ===")
+    header = f"{'op':<18}{'reqs':>7}{'rps':>8}{'err%':>7}{'429':>6}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}{'maxms':>10}"
+    print(header)
+    print("-" * len(header))
+    for op, stats in report["operations"].items():
+        print(f"{op:<18}{stats['requests']:>7}{stats['throughput_rps']:>8}"
+              f"{stats['error_rate'] * 100:>7.1f}{stats['rejected_429']:>6}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    lag = report["event_loop_lag"]
+    print(f"\nEvent-loop lag: p50 {lag['p50_ms']}ms, p99 {lag['p99_ms']}ms, max {lag['max_ms']}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the YTBuddy API")
+    parser.add_argument("--url", help="Target a running server instead of the in-process app (no fakes)")
+    parser.add_argument("--profile", type=parse_profile, default=parse_profile("ask=90,analyze=10"),
+                        help="Traffic mix as op=weight pairs over ask, analyze, ws (default: ask=90,analyze=10)")
+    parser.add_argument("--stages", type=parse_stages, default=parse_stages("10:5,30:20"),
+                        help="Ramp schedule as duration_s:users pairs (default: 10:5,30:20)")
+    parser.add_argument("--videos", type=int, default=5, help="Number of distinct fake video IDs")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean pause between a user's requests (s)")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="Wait for in-flight requests at the end (s)")
+    parser.add_argument("--lag-interval", type=float, default=0.05, help="Event-loop lag sampling interval (s)")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Skip analyzing the videos first; asks on cold videos are reported as *_not_ready")
+
+    fakes = parser.add_argument_group("fake backend latencies (in-process mode)")
+    fakes.add_argument("--ytdlp-latency", type=float, default=1.0, help="Audio download (s)")
+    fakes.add_argument("--whisper-latency", type=float, default=2.0, help="Per transcription window (s)")
+    fakes.add_argument("--gemini-latency", type=float, default=0.8, help="Per Gemini call (s)")
+    fakes.add_argument("--embed-latency", type=float, default=0.2, help="Per embeddings call (s)")
+    fakes.add_argument("--jitter", type=float, default=0.2, help="Uniform jitter as a fraction of each latency")
+    fakes.add_argument("--video-duration", type=float, default=600.0, help="Length of fake audio (s)")
+    fakes.add_argument("--no-rate-limit", action="store_true", help="Disable the summarizer's Gemini throttle")
+    args = parser.parse_args()
+    if args.json_path:
+        args.json_path = os.path.abspath(args.json_path)  # load_app changes the working directory
+
+    app = None if args.url else load_app(args)
+    recorder = asyncio.run(run(args, app))
+    report = build_report(recorder, time.monotonic() - recorder.started)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import analyze, ask
+from app.routes import analyze, ask, analysis
 import os
 from dotenv import load_dotenv
 import logging
 from pathlib import Path
 from app.utils.transcript import load_whisper_model_on_startup # Import the function
+from app.utils.checkpoint import cleanup_checkpoints
 
 load_dotenv()
 
@@ -48,10 +49,12 @@ async def startup_event():
     print("=== STARTING SERVER ===")
     print(f"Gemini Key Loaded: {bool(os.getenv('GEMINI_API_KEY'))}")
     load_whisper_model_on_startup() # Call the synchronous function for model loading
+    cleanup_checkpoints() # Drop transcription checkpoints abandoned before the restart
 
 # Include routes
 app.include_router(analyze.router, prefix="/api", tags=["analyze"])
 app.include_router(ask.router, prefix="/api", tags=["ask"])
+app.include_router(analysis.router, prefix="/api", tags=["analysis"])
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -0,0 +1,112 @@
+from app.utils.preprocess import (
+    remove_fillers, collapse_repeats, split_sentences, dedupe_sentences,
+    select_sentences, preprocess_transcript, estimate_tokens, truncate_to_tokens
+)
+
+
+def test_remove_fillers_drops_fillers_and_keeps_content():
+    text = "Um, so the model, you know, learns uh fast."
+    assert remove_fillers(text) == "so the model, learns fast."
+
+
+def test_remove_fillers_leaves_words_containing_fillers():
+    assert remove_fillers("The umbrella and the error") == "The umbrella and the error"
+
+
+def test_remove_fillers_only_for_languages_with_a_filler_list():
+    german = "Er kommt um acht Uhr."
+    portuguese = "Ele comprou um carro."
+    dutch = "Er zijn um en uh twee."
+    assert remove_fillers(german, "de") == german
+    assert remove_fillers(portuguese, "pt") == portuguese
+    assert remove_fillers(dutch, "nl") == dutch
+    assert remove_fillers(german, None) == german
+
+
+def test_preprocess_transcript_keeps_german_and_portuguese_words():
+    for text, language in (("Er kommt um acht Uhr. Wir warten um neun.", "de"),
+                           ("Ele comprou um carro. Er, ela chegou.", "pt")):
+        result, _ = preprocess_transcript(text, language=language)
+        assert result == text
+
+
+def test_preprocess_transcript_removes_english_fillers():
+    result, _ = preprocess_transcript("Um, the model learns. Uh it, you know, works.", language="en")
+    assert result == "the model learns. it, works."
+
+
+def test_collapse_repeats_keeps_one_copy():
+    assert collapse_repeats("thank you thank you thank you.") == "thank you."
+    assert collapse_repeats("go go go now") == "go now"
+
+
+def test_collapse_repeats_non_latin():
+    assert collapse_repeats("спасибо спасибо спасибо всем") == "спасибо всем"
+    assert collapse_repeats("धन्यवाद धन्यवाद दोस्तों") == "धन्यवाद दोस्तों"
+
+
+def test_split_sentences_handles_danda_and_cjk():
+    assert split_sentences("यह पहला है। यह दूसरा है।") == ["यह पहला है।", "यह दूसरा है।"]
+    assert split_sentences("今天很好。明天见！") == ["今天很好。", "明天见！"]
+    assert split_sentences("First one. Second one?") == ["First one.", "Second one?"]
+
+
+def test_dedupe_sentences_is_case_and_punctuation_insensitive():
+    sentences = ["Hello world.", "hello, world!", "Something else."]
+    assert dedupe_sentences(sentences) == ["Hello world.", "Something else."]
+
+
+def test_dedupe_sentences_keeps_non_english():
+    russian = ["Привет, мир.", "Это тест.", "привет мир!"]
+    hindi = ["नमस्ते दुनिया।", "यह एक परीक्षण है।", "नमस्ते, दुनिया।"]
+    assert dedupe_sentences(russian) == ["Привет, мир.", "Это тест."]
+    assert dedupe_sentences(hindi) == ["नमस्ते दुनिया।", "यह एक परीक्षण है।"]
+
+
+def test_dedupe_sentences_keeps_sentences_without_words():
+    assert dedupe_sentences(["...", "Hi.", "🎵", "🎵"]) == ["...", "Hi.", "🎵", "🎵"]
+
+
+def test_select_sentences_returns_everything_within_budget():
+    sentences = ["Short one.", "Another short one."]
+    assert select_sentences(sentences, token_budget=100) == sentences
+
+
+def test_select_sentences_prefers_recurring_content_in_original_order():
+    sentences = [
+        "Neural networks learn representations from data.",
+        "Random aside about lunch today.",
+        "Training neural networks needs labelled data.",
+    ]
+    chosen = select_sentences(sentences, token_budget=25)
+    assert chosen == [sentences[0], sentences[2]]
+
+
+def test_select_sentences_scores_non_english():
+    sentences = [
+        "Нейронные сети обучаются на данных.",
+        "Сегодня был вкусный обед.",
+        "Нейронные сети требуют данных.",
+    ]
+    chosen = select_sentences(sentences, token_budget=32)
+    assert chosen == [sentences[0], sentences[2]]
+
+
+def test_preprocess_transcript_does_not_wipe_non_english():
+    for text in ("Привет всем. Сегодня мы говорим о данных.",
+                 "नमस्ते सभी को। आज हम डेटा के बारे में बात करेंगे।"):
+        result, stats = preprocess_transcript(text)
+        assert result == text
+        assert stats["compressed_chars"] == len(text)
+
+
+def test_estimate_tokens_is_script_aware():
+    assert estimate_tokens("a" * 400) == 100
+    assert estimate_tokens("机器学习" * 100) == 400
+    assert estimate_tokens("привет" * 100) == 300
+
+
+def test_truncate_to_tokens_fits_the_budget():
+    assert truncate_to_tokens("short", 10) == "short"
+    assert truncate_to_tokens("机器学习" * 10, 5) == "机器学习机"
+    assert estimate_tokens(truncate_to_tokens("ab机" * 50, 7)) <= 7
@@ -0,0 +1,88 @@
+from app.utils.preprocess import estimate_tokens
+from app.utils.retrieval import adaptive_top_k, _merge_blocks, pack_context
+
+
+class Doc:
+    """Minimal stand-in for a LangChain Document."""
+
+    def __init__(self, text, start=None):
+        self.page_content = text
+        self.metadata = {} if start is None else {"start_index": start}
+
+
+def scores(results):
+    return [score for _, score in results]
+
+
+def test_adaptive_top_k_cuts_at_the_largest_gap():
+    results = [(Doc("a"), 0.1), (Doc("b"), 0.12), (Doc("c"), 0.15), (Doc("d"), 0.9), (Doc("e"), 0.95)]
+    assert scores(adaptive_top_k(results, min_k=2, gap_ratio=0.3)) == [0.1, 0.12, 0.15]
+
+
+def test_adaptive_top_k_sorts_input_and_keeps_min_k():
+    results = [(Doc("b"), 0.8), (Doc("a"), 0.1), (Doc("d"), 0.84), (Doc("c"), 0.82)]
+    assert scores(adaptive_top_k(results, min_k=1, gap_ratio=0.3)) == [0.1]
+    # The cliff after the first result is inside min_k, and there is none after it
+    assert scores(adaptive_top_k(results, min_k=2, gap_ratio=0.3)) == [0.1, 0.8, 0.82, 0.84]
+
+
+def test_adaptive_top_k_keeps_everything_without_a_cliff():
+    even = [(Doc(str(i)), i * 0.1) for i in range(6)]
+    assert len(adaptive_top_k(even, min_k=2, gap_ratio=0.3)) == 6
+    flat = [(Doc(str(i)), 0.5) for i in range(4)]
+    assert len(adaptive_top_k(flat, min_k=2, gap_ratio=0.3)) == 4
+
+
+def test_merge_blocks_drops_the_overlap_between_chunks():
+    results = [(Doc("ghijklmn", start=6), 0.2), (Doc("abcdefghij", start=0), 0.1)]
+    blocks = _merge_blocks(results)
+    assert len(blocks) == 1
+    assert blocks[0]["text"] == "abcdefghijklmn"
+    assert (blocks[0]["start"], blocks[0]["end"], blocks[0]["rank"]) == (0, 14, 0)
+
+
+def test_merge_blocks_joins_adjacent_chunks():
+    # Contiguous text, then a chunk after the single space the splitter dropped
+    results = [(Doc("abc", start=0), 0.1), (Doc("def", start=3), 0.2), (Doc("ghi", start=7), 0.3)]
+    blocks = _merge_blocks(results)
+    assert [b["text"] for b in blocks] == ["abcdef ghi"]
+    assert blocks[0]["end"] == 10
+
+
+def test_merge_blocks_keeps_gaps_and_contained_chunks_apart():
+    results = [(Doc("abcdefghij", start=0), 0.3), (Doc("cde", start=2), 0.1), (Doc("xyz", start=20), 0.2)]
+    blocks = _merge_blocks(results)
+    assert [(b["text"], b["rank"]) for b in blocks] == [("abcdefghij", 0), ("xyz", 2)]
+
+
+def test_merge_blocks_dedupes_chunks_without_offsets():
+    results = [(Doc("same"), 0.1), (Doc("same"), 0.2), (Doc("other"), 0.3)]
+    blocks = _merge_blocks(results)
+    assert [(b["text"], b["start"]) for b in blocks] == [("same", None), ("other", None)]
+
+
+def test_pack_context_prefers_rank_and_returns_transcript_order():
+    results = [
+        (Doc("b" * 40, start=100), 0.1),
+        (Doc("a" * 40, start=0), 0.2),
+        (Doc("c" * 40, start=200), 0.3),
+    ]
+    context, stats = pack_context(results, token_budget=20)
+    # 10 tokens per block: the best two fit and come back in transcript order
+    assert context == "a" * 40 + "\n\n" + "b" * 40
+    assert stats["packed_blocks"] == 2
+    assert stats["context_tokens"] == 20
+
+
+def test_pack_context_truncates_an_oversized_first_block():
+    context, stats = pack_context([(Doc("x" * 400, start=0), 0.1)], token_budget=25)
+    assert context == "x" * 100
+    assert stats["context_tokens"] == 25
+
+
+def test_pack_context_enforces_the_budget_for_cjk_text():
+    text = "这是一个关于机器学习的视频。" * 50
+    context, stats = pack_context([(Doc(text, start=0), 0.1)], token_budget=100)
+    assert estimate_tokens(context) <= 100
+    assert len(context) == 100
+    assert stats["context_tokens"] <= 100
@@ -0,0 +1,69 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+whisper = pytest.importorskip("whisper")
+pytest.importorskip("yt_dlp")
+
+from app.utils import checkpoint as checkpoint_store
+from app.utils.transcript import _transcribe_windows
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+
+class FakeModel:
+    """Records the window sizes it is asked to transcribe; one segment per window."""
+
+    def __init__(self, max_calls: int = 10):
+        self.window_sizes = []
+        self.max_calls = max_calls
+
+    def transcribe(self, audio, **kwargs):
+        self.window_sizes.append(len(audio))
+        if len(self.window_sizes) > self.max_calls:
+            raise AssertionError("transcription loop did not terminate")
+        seconds = len(audio) / SAMPLE_RATE
+        return {"language": "en", "segments": [{"start": 0.0, "end": seconds, "text": "words"}]}
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint_store, "CHECKPOINT_DIR", str(tmp_path))
+
+
+def test_non_round_audio_length_finishes():
+    audio = np.zeros(SAMPLE_RATE * 600 + 64, dtype=np.float32)
+    checkpoint = checkpoint_store.new_checkpoint("vid", "tiny", 300)
+    model = FakeModel()
+
+    _transcribe_windows(model, audio, checkpoint, "vid", "tiny")
+
+    assert model.window_sizes == [SAMPLE_RATE * 300, SAMPLE_RATE * 300, 64]
+    assert sum(model.window_sizes) == len(audio)
+    assert checkpoint["next_offset"] == len(audio) / SAMPLE_RATE
+    assert checkpoint["segments"][-1]["start"] == 600.0
+
+
+def test_resume_continues_at_the_checkpointed_sample():
+    audio = np.zeros(SAMPLE_RATE * 650 + 1234, dtype=np.float32)
+    checkpoint = checkpoint_store.new_checkpoint("vid", "tiny", 300)
+    interrupted = FakeModel(max_calls=1)
+    with pytest.raises(AssertionError):
+        _transcribe_windows(interrupted, audio, checkpoint, "vid", "tiny")
+
+    resumed = checkpoint_store.load_checkpoint("vid", "tiny")
+    model = FakeModel()
+    _transcribe_windows(model, audio, resumed, "vid", "tiny")
+
+    assert model.window_sizes == [SAMPLE_RATE * 300, SAMPLE_RATE * 50 + 1234]
+    assert interrupted.window_sizes[0] + sum(model.window_sizes) == len(audio)
+
+
+def test_already_finished_checkpoint_transcribes_nothing():
+    audio = np.zeros(SAMPLE_RATE * 10 + 7, dtype=np.float32)
+    checkpoint = checkpoint_store.new_checkpoint("vid", "tiny", 300)
+    checkpoint["next_offset"] = len(audio) / SAMPLE_RATE
+    model = FakeModel()
+
+    _transcribe_windows(model, audio, checkpoint, "vid", "tiny")
+
+    assert model.window_sizes == []